@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tar and zip archives converted without extracting them.
+
+Members are read one by one from the source archive and written to the
+output one: sources are converted and renamed like the files of a folder
+are, other members are copied unchanged. Tar archives are read and
+written as streams, so compressed ones are never unpacked to disk.
+"""
+
+import copy
+import io
+import tarfile
+import time
+import zipfile
+import file_tools
+
+# archive extension : tar compression ('' is none), zip has None
+ARCHIVE_TYPES = (('.tar.gz', 'gz'), ('.tgz', 'gz'), ('.tar.bz2', 'bz2'),
+                 ('.tbz2', 'bz2'), ('.tar', ''), ('.zip', None))
+
+def get_compression(file_name):
+    """Returns tar compression of archive name, None for zip one."""
+    for extension, compression in ARCHIVE_TYPES:
+        if file_name.lower().endswith(extension):
+            return compression
+    raise ValueError('Unknown archive type of %s, use one of: %s' % (
+        file_name, ', '.join(extension for extension, _ in ARCHIVE_TYPES)))
+
+def is_archive(file_name):
+    """Checks if file name is a name of supported archive."""
+    return file_name.lower().endswith(tuple(
+        extension for extension, _ in ARCHIVE_TYPES))
+
+def is_selected(name, with_subfolders, include=(), exclude=()):
+    """Checks if member is a source to convert, like file_tools.iter_files
+    selects files of a folder."""
+    # tar members are often like './Classes/Hero.m'
+    parts = [part for part in name.split('/') if part not in ('', '.')]
+    if not file_tools.is_processable_file(parts[-1]):
+        return False
+    if len(parts) > 1 and not with_subfolders:
+        return False
+    if exclude:
+        for end in xrange(1, len(parts) + 1):
+            if file_tools.matches(parts[end - 1], '/'.join(parts[:end]),
+                                  exclude):
+                return False
+    return not include or file_tools.matches(parts[-1], '/'.join(parts),
+                                             include)
+
+class Member(object):
+    """Member of archive, data is None for all but regular files."""
+    def __init__(self, name, data, mtime, mode, info):
+        """Member creation, info is TarInfo or ZipInfo of the archive."""
+        self.name = name
+        self.data = data
+        self.mtime = mtime
+        self.mode = mode
+        self.info = info
+
+    @property
+    def is_dir(self):
+        """Checks if member is a folder."""
+        if isinstance(self.info, tarfile.TarInfo):
+            return self.info.isdir()
+        return self.name.endswith('/')
+
+def read_tar(file_name):
+    """Yields members of tar archive read as a stream."""
+    with tarfile.open(file_name, 'r|*') as archive:
+        for info in archive:
+            data = archive.extractfile(info).read() if info.isfile() \
+                else None
+            yield Member(info.name, data, info.mtime, info.mode, info)
+
+def read_zip(file_name):
+    """Yields members of zip archive."""
+    with zipfile.ZipFile(file_name) as archive:
+        for info in archive.infolist():
+            data = None if info.filename.endswith('/') \
+                else archive.read(info)
+            yield Member(info.filename, data,
+                         time.mktime(info.date_time + (0, 0, -1)),
+                         info.external_attr >> 16, info)
+
+def read_members(file_name):
+    """Yields members of tar or zip archive."""
+    if get_compression(file_name) is None:
+        return read_zip(file_name)
+    return read_tar(file_name)
+
+class ArchiveWriter(object):
+    """Output tar or zip archive, its type is given by the name."""
+    def __init__(self, file_name):
+        """Creates archive."""
+        self._compression = get_compression(file_name)
+        if self._compression is None:
+            self._archive = zipfile.ZipFile(file_name, 'w',
+                                            zipfile.ZIP_DEFLATED)
+        else:
+            self._archive = tarfile.open(file_name,
+                                         'w|' + self._compression)
+
+    def __enter__(self):
+        """Returns archive for with statement."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Closes archive."""
+        self.close()
+
+    def close(self):
+        """Finishes archive."""
+        self._archive.close()
+
+    def add(self, member, name=None, data=None):
+        """Writes member under name with data, both are the member ones
+        if they are not given."""
+        name = member.name if name is None else name
+        data = member.data if data is None else data
+        if self._compression is None:
+            self._add_zip(member, name, data)
+        else:
+            self._add_tar(member, name, data)
+
+    def _add_tar(self, member, name, data):
+        """Writes member to tar archive."""
+        if isinstance(member.info, tarfile.TarInfo):
+            info = copy.copy(member.info)
+            info.name = name
+        elif member.is_dir:
+            info = tarfile.TarInfo(name.rstrip('/'))
+            info.type = tarfile.DIRTYPE
+        else:
+            info = tarfile.TarInfo(name)
+        info.mtime = member.mtime
+        info.mode = member.mode or (0755 if member.is_dir else 0644)
+        if data is None:
+            self._archive.addfile(info)
+            return
+        info.size = len(data)
+        self._archive.addfile(info, io.BytesIO(data))
+
+    def _add_zip(self, member, name, data):
+        """Writes member to zip archive, links and devices are skipped."""
+        if data is None and not member.is_dir:
+            return
+        if member.is_dir and not name.endswith('/'):
+            name += '/'
+        if isinstance(member.info, zipfile.ZipInfo):
+            info = copy.copy(member.info)
+            info.filename = name
+        else:
+            # zip dates start in 1980
+            info = zipfile.ZipInfo(name, time.localtime(
+                max(member.mtime, 315532800))[:6])
+            info.external_attr = (member.mode & 0xFFFF) << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+        self._archive.writestr(info, data or '')
@@ -0,0 +1,9 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Benchmarks for Cocos2d to Cocos2d-x converter.
+
+Run them from the project folder, e.g. python -m benchmarks.startup
+"""
+
+__all__ = []
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Synthetic Objective-C/Cocos2d corpus for the benchmarks.
+
+Generated code exercises the lexer paths of CocosLexer: nested
+[obj msg:arg] calls, @interface/@implementation, @selector, format
+strings and long comments. The same seed gives the same corpus.
+"""
+
+import argparse
+import os
+import random
+
+CLASSES = ('Hero', 'Enemy', 'Bullet', 'Level', 'Menu', 'Score', 'Boss',
+           'Coin', 'Tile', 'Cloud')
+BASES = ('CCSprite', 'CCNode', 'CCLayer', 'NSObject')
+TYPES = ('int', 'float', 'BOOL', 'CGPoint', 'CGSize', 'NSString *',
+         'NSArray *', 'id')
+WORDS = ('position', 'velocity', 'target', 'duration', 'score', 'level',
+         'speed', 'angle', 'count', 'delay', 'scale', 'color')
+ACTIONS = ('CCMoveTo', 'CCMoveBy', 'CCScaleTo', 'CCRotateBy', 'CCFadeIn')
+LOREM = ('the', 'sprite', 'is', 'moved', 'by', 'scheduler', 'and', 'each',
+         'frame', 'updates', 'its', 'state', 'before', 'drawing')
+
+# kinds of generated files in turn
+EXTENSIONS = ('.h', '.m', '.mm')
+
+def comment(rng, lines):
+    """Returns multiline comment."""
+    text = '\n'.join('   ' + ' '.join(rng.choice(LOREM)
+                                       for _ in range(rng.randint(6, 14)))
+                     for _ in range(lines))
+    return '/*\n%s\n */\n' % text
+
+def method_name(rng):
+    """Returns name of Obj-C method with the first part."""
+    return rng.choice(('moveTo', 'runWith', 'setup', 'updateWith', 'spawn'))
+
+def statement(rng, depth):
+    """Returns one statement of method body."""
+    indent = '    ' * depth
+    word = rng.choice(WORDS)
+    kind = rng.randint(0, 9)
+    if kind == 0:
+        return indent + ('[self runAction:[CCSequence actions:[%s '
+                         'actionWithDuration:%.1ff position:ccp(%d, %d)], '
+                         '[CCCallFunc actionWithTarget:self selector:'
+                         '@selector(%sDone)], nil]];\n') % (
+                             rng.choice(ACTIONS), rng.random() * 3,
+                             rng.randint(0, 480), rng.randint(0, 320), word)
+    elif kind == 1:
+        return indent + 'NSLog(@"%s %%@ has %%d of %%f (%%%%@ kept)", ' \
+            '[self description], %d, %s);\n' % (
+                word, rng.randint(0, 99), word)
+    elif kind == 2:
+        return indent + 'NSString *%sText = [NSString stringWithFormat:' \
+            '@"%%@-%%d", %s, %d];\n' % (word, word, rng.randint(0, 9))
+    elif kind == 3:
+        return indent + '[self schedule:@selector(tick:) interval:%.2ff];\n' \
+            % rng.random()
+    elif kind == 4:
+        return indent + 'if (self.%s > %d && [self isVisible]) {\n' % (
+            word, rng.randint(0, 9)) + \
+            statement(rng, depth + 1) + indent + '}\n'
+    elif kind == 5:
+        return indent + 'for (int i = 0; i < %d; i++) {\n' % \
+            rng.randint(2, 64) + statement(rng, depth + 1) + \
+            statement(rng, depth + 1) + indent + '}\n'
+    elif kind == 6:
+        return indent + 'CGPoint p = ccp(%d, %d);\n' % (
+            rng.randint(0, 480), rng.randint(0, 320)) + indent + \
+            'BOOL hit = CGRectContainsPoint([[self %s] boundingBox], p);\n' \
+            % word
+    elif kind == 7:
+        return indent + '// %s\n' % ' '.join(rng.choice(LOREM)
+                                              for _ in range(8))
+    elif kind == 8:
+        return indent + 'NSArray *items = [NSArray arrayWithObjects:' \
+            '@"%s", @"%s", [NSNumber numberWithInt:%d], nil];\n' % (
+                rng.choice(LOREM), rng.choice(LOREM), rng.randint(0, 99))
+    return indent + 'id %s = [[%s alloc] initWith%s:[self %s] scale:%d];\n' % (
+        word, rng.choice(CLASSES), word.capitalize(), word,
+        rng.randint(1, 4))
+
+def method(rng, class_name):
+    """Returns implementation of one method."""
+    name = method_name(rng)
+    sign = rng.choice('-+')
+    args = ''.join(' %s:(%s)%s' % (rng.choice(WORDS), rng.choice(TYPES),
+                                  rng.choice(WORDS) + str(i))
+                   for i in range(rng.randint(0, 2)))
+    body = ''.join(statement(rng, 1) for _ in range(rng.randint(3, 12)))
+    return '%s(void) %s%s:(%s)value%s {\n%s}\n\n' % (
+        sign, name, class_name, rng.choice(TYPES), args, body)
+
+def header(rng, class_name, size):
+    """Returns interface of class of about size bytes."""
+    head = '#import "cocos2d.h"\n\n@class %s;\n\n%s@interface %s : %s {\n' \
+        % (rng.choice(CLASSES), comment(rng, 3), class_name, rng.choice(BASES))
+    ivars, decls = [], []
+    length = len(head)
+    while length < size:
+        ivars.append('    %s %s%d;\n' % (rng.choice(TYPES), rng.choice(WORDS),
+                                         len(ivars)))
+        decls.append('-(void) %s%s:(%s)value;\n' % (
+            method_name(rng), class_name, rng.choice(TYPES)))
+        length += len(ivars[-1]) + len(decls[-1])
+    return head + ''.join(ivars) + '}\n' + ''.join(decls) + '@end\n'
+
+def source(rng, class_name, size):
+    """Returns implementation of class of about size bytes."""
+    parts = ['#import "%s.h"\n\n' % class_name, comment(rng, 12),
+             '@implementation %s\n\n' % class_name]
+    length = sum(len(part) for part in parts)
+    while length < size:
+        part = method(rng, class_name)
+        if rng.randint(0, 3) == 0:
+            part = comment(rng, rng.randint(2, 30)) + part
+        parts.append(part)
+        length += len(part)
+    parts.append('@end\n')
+    return ''.join(parts)
+
+def generate_file(rng, extension, size, index=0):
+    """Returns code of file with extension of about size bytes."""
+    class_name = CLASSES[index % len(CLASSES)] + str(index)
+    if extension == '.h':
+        return header(rng, class_name, size)
+    return source(rng, class_name, size)
+
+def generate(folder, files=30, size=16384, seed=0):
+    """Writes corpus of files of about size bytes, returns their names."""
+    rng = random.Random(seed)
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    names = []
+    for index in range(files):
+        extension = EXTENSIONS[index % len(EXTENSIONS)]
+        name = os.path.join(folder, 'File%d%s' % (index, extension))
+        with open(name, 'w') as out:
+            out.write(generate_file(rng, extension, size, index))
+        names.append(name)
+    return names
+
+def main():
+    """Writes corpus to the folder."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('folder', help='Output folder.')
+    parser.add_argument('--files', type=int, default=30, help='Files count.')
+    parser.add_argument('--size', type=int, default=16384,
+                        help='Approximate file size in bytes.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+    args = parser.parse_args()
+    generate(args.folder, args.files, args.size, args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Conformance and throughput of tokenizer engines against PLY.
+
+Every file is converted by every engine for both targets and the outputs
+must be identical to the PLY ones; the exit code is 1 otherwise. Files of
+the synthetic corpus are checked always, more files or folders can be
+given, e.g.
+
+    python -m benchmarks.engines ~/projects/game/Classes
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import file_tools
+import to2dx
+from benchmarks import corpus
+
+def make_lexers(v2_flag):
+    """Returns {engine: lexer} for the target."""
+    lexers = {}
+    for engine in to2dx.ENGINES:
+        cocos_lexer = to2dx.CocosLexer()
+        cocos_lexer.build(engine=engine)
+        cocos_lexer.init_version(v2_flag)
+        lexers[engine] = cocos_lexer
+    return lexers
+
+def convert(cocos_lexer, file_name):
+    """Returns (code, tokens count, seconds) of file conversion."""
+    cocos_lexer.refresh()
+    start = time.time()
+    cocos_lexer.feed_from_file(file_name)
+    code = cocos_lexer.render()
+    return code, cocos_lexer.token_count, time.time() - start
+
+def first_difference(expected, actual):
+    """Returns description of the first different line."""
+    expected_lines = expected.splitlines()
+    actual_lines = actual.splitlines()
+    for number, (left, right) in enumerate(zip(expected_lines,
+                                               actual_lines), 1):
+        if left != right:
+            return 'line %d:\n  ply:  %r\n  got:  %r' % (number, left, right)
+    return 'line %d: length differs' % (min(len(expected_lines),
+                                           len(actual_lines)) + 1)
+
+def check(file_list, v2_flag, totals):
+    """Compares engines on files, returns count of mismatches."""
+    lexers = make_lexers(v2_flag)
+    failures = 0
+    for fname in file_list:
+        expected, tokens, seconds = convert(lexers['ply'], fname)
+        totals['ply'][0] += tokens
+        totals['ply'][1] += seconds
+        for engine in to2dx.ENGINES[1:]:
+            code, tokens, seconds = convert(lexers[engine], fname)
+            totals[engine][0] += tokens
+            totals[engine][1] += seconds
+            if code != expected:
+                failures += 1
+                print 'MISMATCH %s (%s, %s) %s' % (
+                    fname, engine, 'v2' if v2_flag else 'v3',
+                    first_difference(expected, code))
+    return failures
+
+def main():
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*', help='More files or folders.')
+    parser.add_argument('--files', type=int, default=30,
+                        help='Files in the corpus.')
+    parser.add_argument('--size', type=int, default=32768,
+                        help='Approximate file size in bytes.')
+    parser.add_argument('--seed', type=int, default=0, help='Corpus seed.')
+    args = parser.parse_args()
+    folder = tempfile.mkdtemp(prefix='corpus')
+    try:
+        file_list = corpus.generate(folder, args.files, args.size, args.seed)
+        for path in args.paths:
+            file_list.extend(file_tools.get_file_list(path, True))
+        size = 2 * sum(os.path.getsize(fname) for fname in file_list)
+        totals = dict((engine, [0, 0.0]) for engine in to2dx.ENGINES)
+        failures = sum(check(file_list, v2_flag, totals)
+                       for v2_flag in (True, False))
+    finally:
+        shutil.rmtree(folder)
+    for engine in to2dx.ENGINES:
+        tokens, seconds = totals[engine]
+        print '%-5s %9.0f tokens/s %7.3f MB/s %6.2fx' % (
+            engine, tokens / seconds, size / seconds / (1 << 20),
+            totals['ply'][1] / seconds)
+    print '%d file(s) x 2 targets, %d mismatch(es)' % (len(file_list),
+                                                       failures)
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
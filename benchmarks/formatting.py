@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""End-to-end conversion time with the built-in formatter and with
+clang-format run over every output, on the synthetic corpus.
+
+    python -m benchmarks.formatting --clang-format /usr/bin/clang-format-14
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from distutils.spawn import find_executable
+import format2dx
+import to2dx
+from benchmarks import corpus
+
+def convert_all(cocos_lexer, file_list, folder, formatter=None,
+                clang_format=None):
+    """Converts files to folder, returns seconds of the whole run."""
+    start = time.time()
+    for fname in file_list:
+        cocos_lexer.feed_from_file(fname)
+        out_name = os.path.join(folder, os.path.basename(fname) + '.cpp')
+        with open(out_name, 'w') as out:
+            out.write(cocos_lexer.render(formatter))
+        cocos_lexer.refresh()
+        if clang_format is not None:
+            subprocess.check_call([clang_format, '-i', out_name])
+    return time.time() - start
+
+def main():
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=100,
+                        help='Count of generated files.')
+    parser.add_argument('--size', type=int, default=16384,
+                        help='Size of generated file in bytes.')
+    parser.add_argument('--engine', '-e', choices=to2dx.ENGINES,
+                        default='ply', help='Tokenizer engine.')
+    parser.add_argument('--clang-format', metavar='PATH',
+                        default=find_executable('clang-format'),
+                        help='clang-format executable (default: from PATH).')
+    args = parser.parse_args()
+    folder = tempfile.mkdtemp(prefix='formatting')
+    try:
+        file_list = corpus.generate(os.path.join(folder, 'src'), args.files,
+                                    args.size)
+        out_folder = os.path.join(folder, 'out')
+        os.mkdir(out_folder)
+        cocos_lexer = to2dx.CocosLexer()
+        cocos_lexer.build(engine=args.engine)
+        cocos_lexer.init_version(False)
+        runs = [('unformatted', None, None),
+                ('built-in', format2dx.Formatter(), None)]
+        if args.clang_format:
+            runs.append(('clang-format', None, args.clang_format))
+        times = {}
+        for name, formatter, clang_format in runs:
+            times[name] = convert_all(cocos_lexer, file_list, out_folder,
+                                      formatter, clang_format)
+            print '%-12s %8.2f s %8.2f ms/file' % (
+                name, times[name], times[name] * 1000 / len(file_list))
+        print 'formatter overhead: %.1f%%' % (
+            (times['built-in'] / times['unformatted'] - 1) * 100)
+        if 'clang-format' in times:
+            print 'saved by the built-in formatter: %.2f s (%.1fx faster)' % (
+                times['clang-format'] - times['built-in'],
+                times['clang-format'] / times['built-in'])
+        else:
+            print 'clang-format is not found, give it by --clang-format'
+    finally:
+        shutil.rmtree(folder)
+
+if __name__ == '__main__':
+    main()
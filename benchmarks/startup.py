@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Startup time of CocosLexer: cold build against cached lexer tables.
+
+Every sample is a fresh interpreter, so nothing is shared through the
+regular expressions cache of the parent process.
+"""
+
+import argparse
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+def child(cache_dir):
+    """Builds the lexer once and prints build time."""
+    from to2dx import CocosLexer
+    start = time.time()
+    CocosLexer().build(cache_dir=cache_dir)
+    print time.time() - start
+
+def sample(cache_dir):
+    """Returns (build time, process time) of one fresh interpreter."""
+    command = [sys.executable, '-m', 'benchmarks.startup', '--child']
+    if cache_dir:
+        command.append(cache_dir)
+    start = time.time()
+    output = subprocess.check_output(command)
+    return float(output), time.time() - start
+
+def report(name, samples):
+    """Prints the best and average of samples."""
+    builds, processes = zip(*samples)
+    print '%-7s build: best %7.2f ms, avg %7.2f ms | process: best %7.2f ms' % (
+        name, min(builds) * 1000, sum(builds) / len(builds) * 1000,
+        min(processes) * 1000)
+    return min(builds)
+
+def main():
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', '-n', type=int, default=10,
+                        help='Fresh interpreters per mode.')
+    parser.add_argument('--child', nargs='?', const='', default=None,
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        child(args.child or None)
+        return
+    cache_dir = tempfile.mkdtemp(prefix='lextab')
+    try:
+        sample(cache_dir)  # warm the cache
+        cold = report('cold', [sample(None) for _ in range(args.repeat)])
+        cached = report('cached', [sample(cache_dir)
+                                   for _ in range(args.repeat)])
+        print 'speedup: %.1fx' % (cold / cached)
+    finally:
+        shutil.rmtree(cache_dir)
+
+if __name__ == '__main__':
+    main()
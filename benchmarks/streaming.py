@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Time and peak memory of whole and streaming conversion of a large file.
+
+Every conversion runs in its own process, so its peak memory is known.
+"""
+
+import argparse
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import file_tools
+import stream2dx
+from benchmarks import corpus
+from to2dx import ENGINES, CocosLexer
+
+def convert(mode, engine, in_name, out_name):
+    """Converts file, returns (seconds, peak memory growth in MB)."""
+    cocos_lexer = CocosLexer()
+    cocos_lexer.build(engine=engine)
+    cocos_lexer.init_version(False)
+    base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+    if mode == 'whole':
+        cocos_lexer.feed_from_file(in_name)
+        file_tools.write_file(out_name, cocos_lexer.render())
+    else:
+        converter = stream2dx.StreamConverter(cocos_lexer)
+        with open(in_name, 'r') as in_file:
+            file_tools.write_file(out_name, converter.convert(
+                stream2dx.read_chunks(in_file)))
+    elapsed = time.time() - start
+    return elapsed, (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss -
+                     base) / 1024.0
+
+def main():
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=float, default=16.0,
+                        help='Source size in megabytes.')
+    parser.add_argument('--engine', '-e', choices=ENGINES, default='fast',
+                        help='Tokenizer engine.')
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        print '%f %f' % convert(args.child[0], args.engine, *args.child[1:])
+        return
+    folder = tempfile.mkdtemp(prefix='streaming')
+    try:
+        in_name = os.path.join(folder, 'Large.m')
+        with open(in_name, 'w') as in_file:
+            in_file.write(corpus.generate_file(random.Random(0), '.m',
+                                               int(args.size * (1 << 20))))
+        size = os.path.getsize(in_name) / float(1 << 20)
+        outputs = []
+        for mode in ('whole', 'stream'):
+            out_name = os.path.join(folder, mode + '.cpp')
+            line = subprocess.check_output(
+                [sys.executable, '-m', 'benchmarks.streaming',
+                 '--engine', args.engine, '--child', mode, in_name,
+                 out_name])
+            elapsed, memory = [float(value) for value in line.split()]
+            outputs.append(out_name)
+            print '%-6s %8.2f MB/s %8.1f MB peak memory (%.1f MB source)' % (
+                mode, size / elapsed, memory, size)
+        with open(outputs[0]) as whole, open(outputs[1]) as stream:
+            if whole.read() != stream.read():
+                raise SystemExit('outputs differ')
+    finally:
+        shutil.rmtree(folder)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tokenizing time of pathological sources, it must be linear in size.
+
+Every case is generated at the full size and at a quarter of it, both
+sizes are doubled until the quarter one takes long enough to be measured
+above timer noise. The exit code is 1 if time per byte exceeds the budget
+or grows with the size more than allowed, e.g. for a quadratic rule,
+whose time per byte grows 4 times.
+
+    python -m benchmarks.stress --size 8 --engine ply
+"""
+
+import argparse
+import sys
+import time
+import to2dx
+
+# seconds of the quarter size run, growth of shorter times is timer noise
+MIN_TIME = 0.2
+
+# bound of doubling the sizes, times the given size
+MAX_SCALE = 16
+
+def long_comment(size):
+    """License-like comment block."""
+    return '/*' + ' * Copyright (c) the authors. *\n' * (size / 34) + '*/\n'
+
+def starry_comment(size):
+    """Comment of stars, which may end any of them."""
+    return '/*' + '**x*' * (size / 4) + '*/\n'
+
+def open_comment(size):
+    """Comment which is never closed, the rest is tokenized as code."""
+    return '/* ' + 'a = b;\n' * (size / 7)
+
+def long_line_comment(size):
+    """Single line comment with backslashes."""
+    return '// ' + 'x\\' * (size / 2) + '\n'
+
+def long_string(size):
+    """String with escaped quotes and line continuations."""
+    return '@"' + 'a\\"b\\\n' * (size / 6) + '";\n'
+
+def open_string(size):
+    """String without unescaped closing quote on its line."""
+    return '"' + 'a\\"b' * (size / 4) + '\n'
+
+def blank_lines(size):
+    """Run of whitespace lines."""
+    return 'a' + ' \t\n \r\n\n' * (size / 7) + 'b\n'
+
+def continued_directive(size):
+    """Preprocessor directive continued over many lines."""
+    return '#if LONG ' + '&& a \\\n' * (size / 7) + '\n'
+
+CASES = (long_comment, starry_comment, open_comment, long_line_comment,
+         long_string, open_string, blank_lines, continued_directive)
+
+def measure(cocos_lexer, code, repeat):
+    """Returns the best tokenizing time of repeat runs."""
+    best = None
+    for _ in range(repeat):
+        cocos_lexer.refresh()
+        cocos_lexer.feed(code)
+        start = time.time()
+        for _ in cocos_lexer:
+            pass
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def measure_case(cocos_lexer, case, size, repeat):
+    """Returns microseconds per byte of the quarter and full size of case
+    and the quarter size time, the sizes are doubled until it is at least
+    MIN_TIME (up to MAX_SCALE times)."""
+    max_size = size * MAX_SCALE
+    while True:
+        per_byte = []
+        times = []
+        for case_size in (size / 4, size):
+            code = case(case_size)
+            seconds = measure(cocos_lexer, code, repeat)
+            per_byte.append(seconds * 1e6 / len(code))
+            times.append(seconds)
+        if times[0] >= MIN_TIME or size * 2 > max_size:
+            return per_byte, times[0]
+        size *= 2
+
+def check_case(cocos_lexer, case, size, repeat=3, budget=10.0, growth=2.5):
+    """Returns (failed flag, microseconds per byte of the full and quarter
+    size, growth) of case."""
+    per_byte, quarter_time = measure_case(cocos_lexer, case, size, repeat)
+    ratio = per_byte[1] / max(per_byte[0], 1e-9)
+    failed = per_byte[1] > budget or \
+        (ratio > growth and quarter_time >= MIN_TIME)
+    return failed, per_byte[1], per_byte[0], ratio
+
+def main():
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=float, default=4.0,
+                        help='Source size in megabytes.')
+    parser.add_argument('--engine', '-e', choices=to2dx.ENGINES,
+                        action='append',
+                        help='Engine to check (can be repeated, all by '
+                        'default).')
+    parser.add_argument('--budget', type=float, default=10.0,
+                        help='Allowed microseconds per byte.')
+    parser.add_argument('--growth', type=float, default=2.5,
+                        help='Allowed ratio of time per byte of the full '
+                        'size to the quarter one.')
+    parser.add_argument('--repeat', '-n', type=int, default=3,
+                        help='Runs per case, the best one counts.')
+    args = parser.parse_args()
+    size = int(args.size * (1 << 20))
+    failures = 0
+    print '%-8s %-20s %10s %10s %8s' % ('engine', 'case', 'us/byte',
+                                         'quarter', 'growth')
+    for engine in args.engine or to2dx.ENGINES:
+        cocos_lexer = to2dx.CocosLexer()
+        cocos_lexer.build(engine=engine)
+        cocos_lexer.init_version(False)
+        for case in CASES:
+            failed, full, quarter, growth = check_case(
+                cocos_lexer, case, size, args.repeat, args.budget,
+                args.growth)
+            failures += failed
+            print '%-8s %-20s %10.3f %10.3f %7.2fx%s' % (
+                engine, case.__name__, full, quarter, growth,
+                '  FAILED' if failed else '')
+    print '%d failure(s)' % failures
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
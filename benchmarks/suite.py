@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Conversion speed of CocosLexer on the synthetic corpus.
+
+Measures tokens/sec, MB/sec and peak memory for Cocos2d-x-2 and
+Cocos2d-x-3 targets and writes results as JSON, e.g.
+
+    python -m benchmarks.suite --output today.json --compare last.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import ply.lex as lex
+import to2dx
+from benchmarks import corpus
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# target name : Cocos2d-x-2 flag
+TARGETS = (('v2', True), ('v3', False))
+
+# compared metrics : True if bigger is better
+METRICS = (('tokens_per_sec', True), ('mb_per_sec', True),
+           ('peak_rss_kb', False))
+
+def peak_rss_kb():
+    """Returns peak resident memory of the process in kilobytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def run_target(file_list, v2_flag, repeat, engine):
+    """Converts files in memory, returns measurements of the best run."""
+    cocos_lexer = to2dx.CocosLexer()
+    cocos_lexer.build(engine=engine)
+    cocos_lexer.init_version(v2_flag)
+    size = sum(os.path.getsize(fname) for fname in file_list)
+    best = tokens = None
+    for _ in range(repeat):
+        tokens = 0
+        start = time.time()
+        for fname in file_list:
+            cocos_lexer.feed_from_file(fname)
+            cocos_lexer.render()
+            tokens += cocos_lexer.token_count
+            cocos_lexer.refresh()
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {'files': len(file_list), 'bytes': size, 'tokens': tokens,
+            'seconds': best, 'tokens_per_sec': tokens / best,
+            'mb_per_sec': size / best / (1 << 20),
+            'peak_rss_kb': peak_rss_kb()}
+
+def _measure(queue, file_list, v2_flag, repeat, engine):
+    """Runs target in the child process, so peak memory is its own."""
+    queue.put(run_target(file_list, v2_flag, repeat, engine))
+
+def measure(file_list, v2_flag, repeat, engine):
+    """Returns measurements of the target taken in a fresh process."""
+    queue = multiprocessing.Queue()
+    child = multiprocessing.Process(target=_measure,
+                                    args=(queue, file_list, v2_flag, repeat,
+                                          engine))
+    child.start()
+    result = queue.get()
+    child.join()
+    return result
+
+def compare(results, old_results):
+    """Prints relative change against older results."""
+    old = dict((item['target'], item) for item in old_results['results'])
+    for item in results['results']:
+        if item['target'] not in old:
+            continue
+        for name, bigger_is_better in METRICS:
+            before, after = old[item['target']][name], item[name]
+            if not before or after is None:
+                continue
+            change = (after - before) * 100.0 / before
+            better = (change > 0) == bigger_is_better
+            print '%s %-14s %+7.1f%% %s' % (item['target'], name, change,
+                                            'better' if better else 'worse')
+
+def main():
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=30,
+                        help='Files in the corpus.')
+    parser.add_argument('--size', type=int, default=32768,
+                        help='Approximate file size in bytes.')
+    parser.add_argument('--seed', type=int, default=0, help='Corpus seed.')
+    parser.add_argument('--repeat', '-n', type=int, default=3,
+                        help='Runs per target, the best one is kept.')
+    parser.add_argument('--engine', '-e', choices=to2dx.ENGINES,
+                        default='ply', help='Tokenizer engine.')
+    parser.add_argument('--output', '-o', help='JSON file for results.')
+    parser.add_argument('--compare', '-c', help='JSON file of older results.')
+    args = parser.parse_args()
+    folder = tempfile.mkdtemp(prefix='corpus')
+    try:
+        file_list = corpus.generate(folder, args.files, args.size, args.seed)
+        results = {'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                   'python': platform.python_version(),
+                   'ply': lex.__version__,
+                   'lexer': to2dx.lextab_name(),
+                   'engine': args.engine,
+                   'corpus': {'files': args.files, 'size': args.size,
+                              'seed': args.seed},
+                   'results': []}
+        for target, v2_flag in TARGETS:
+            item = measure(file_list, v2_flag, args.repeat, args.engine)
+            item['target'] = target
+            results['results'].append(item)
+            print '%s: %d tokens, %.0f tokens/s, %.3f MB/s, peak %s KB' % (
+                target, item['tokens'], item['tokens_per_sec'],
+                item['mb_per_sec'], item['peak_rss_kb'])
+    finally:
+        shutil.rmtree(folder)
+    if args.output:
+        with open(args.output, 'w') as out:
+            json.dump(results, out, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as in_file:
+            compare(results, json.load(in_file))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Output throughput of CocosLexer on large sources (bytes per second).
+
+Compares the buffered emitter (feed_from_file + file_output) with the
+former per-token writer fed by readlines().
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import file_tools
+from benchmarks import corpus
+from to2dx import CocosLexer
+
+def legacy_output(cocos_lexer, in_name, out_name):
+    """Former input reading and per-token output."""
+    with open(in_name, 'r') as in_file:
+        cocos_lexer.feed(''.join(in_file.readlines()))
+        cocos_lexer.is_header = file_tools.is_header(in_name)
+    with open(out_name, 'w') as out:
+        for tok in cocos_lexer:
+            out.write('%s ' % tok.value)
+            if tok.type == 'NEWLINE':
+                out.write('\t' * cocos_lexer.brace_counter)
+
+def buffered_output(cocos_lexer, in_name, out_name):
+    """Current input reading and output."""
+    cocos_lexer.feed_from_file(in_name)
+    cocos_lexer.file_output(out_name)
+
+def measure(function, cocos_lexer, in_name, out_name, repeat):
+    """Returns the best time of repeat runs."""
+    best = None
+    for _ in range(repeat):
+        cocos_lexer.refresh()
+        start = time.time()
+        function(cocos_lexer, in_name, out_name)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    """Benchmark entry point."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=float, default=4.0,
+                        help='Source size in megabytes.')
+    parser.add_argument('--repeat', '-n', type=int, default=3,
+                        help='Runs per emitter.')
+    args = parser.parse_args()
+    folder = tempfile.mkdtemp(prefix='throughput')
+    try:
+        in_name = os.path.join(folder, 'Large.m')
+        with open(in_name, 'w') as in_file:
+            in_file.write(corpus.generate_file(random.Random(0), '.m',
+                                               int(args.size * (1 << 20))))
+        size = os.path.getsize(in_name)
+        cocos_lexer = CocosLexer()
+        cocos_lexer.build()
+        cocos_lexer.init_version(False)
+        outputs = []
+        for name, function in (('legacy', legacy_output),
+                               ('buffered', buffered_output)):
+            out_name = os.path.join(folder, name + '.cpp')
+            best = measure(function, cocos_lexer, in_name, out_name,
+                           args.repeat)
+            outputs.append(out_name)
+            print '%-8s %8.2f MB/s (%.2f s for %.1f MB)' % (
+                name, size / best / (1 << 20), best, size / float(1 << 20))
+        with open(outputs[0]) as legacy, open(outputs[1]) as buffered:
+            if legacy.read() != buffered.read():
+                raise SystemExit('outputs differ')
+    finally:
+        shutil.rmtree(folder)
+
+if __name__ == '__main__':
+    main()
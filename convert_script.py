@@ -6,41 +6,216 @@
 # Entry point
 if __name__ == '__main__':
     import argparse
+    import itertools
+    import archive_tools
+    import convert_tools
+    import deps_tools
     import file_tools
-    from to2dx import CocosLexer
-#     import sys
+    import index_tools
+    import journal_tools
+    import manifest_tools
+    import metrics_tools
+    import pipeline_tools
+    import profile_tools
+    import shard_tools
+    import supervise_tools
+    import sys
+    import to2dx
+    import watch_tools
     # pylint: disable=line-too-long
     parser = argparse.ArgumentParser(description='Cocos2d to Cocos2d-x-2 code converter.', usage='%(prog)s <path> [arguments]')
-    parser.add_argument('path', metavar='FILE_OR_FOLDER', type=str, nargs=1, help='Path to file or folder.')
+    parser.add_argument('path', metavar='FILE_OR_FOLDER', type=str, nargs=1, help='Path to file or folder, - converts standard input to standard output.')
+    parser.add_argument('--header', action='store_true', default=False,
+                        help='Standard input is a header (with - path).')
+    parser.add_argument('--framed', action='store_true', default=False,
+                        help='Convert many documents sent over standard input, each one after "<size>[ header|source]" line, answered by "<size>" chunks ending with "0" line (with - path).')
     parser.add_argument('--rollback', '-r', action='store_true', default=False,
-                        help='Rollback backuped files in pointed folder (ignore other flags except subfolders).')
+                        help='Rollback backuped files in pointed folder (ignore other flags except subfolders and journal).')
     parser.add_argument('--remove-backup', '-m', action='store_true', default=False,
-                        help='Remove backuped files (ignore other flags except rollback and subfolders).')
+                        help='Remove backuped files (ignore other flags except rollback, subfolders and journal).')
     parser.add_argument('--debug', '-d', action='store_true', default=False,
                         help='Prints interpreter result in console for the 1st file only and interrupts.')
     parser.add_argument('--backup', '-b', action='store_true', default=False, help='Store old code in *.bak files.')
+    parser.add_argument('--backup-mode', choices=file_tools.BACKUP_MODES, default='copy',
+                        help='Copy sources to backups or move them there without copying (default: %(default)s).')
+    parser.add_argument('--journal', '-J', action='store_true', default=False,
+                        help='Record backups and outputs, with --rollback or --remove-backup replay the journal instead of searching the tree.')
     parser.add_argument('--subfolders', '-s', action='store_true', default=False, help='Do options in subfolders.')
+    parser.add_argument('--include', metavar='PATTERN', action='append', default=[],
+                        help='Convert only files whose name or relative path matches glob pattern (can be repeated).')
+    parser.add_argument('--exclude', metavar='PATTERN', action='append', default=[],
+                        help='Skip files and folders whose name or relative path matches glob pattern, e.g. Pods (can be repeated).')
     parser.add_argument('--second', '-2', action='store_true', default=False, help='Convert to Cocos2d-x-2.*.')
+    parser.add_argument('--jobs', '-j', metavar='N', type=int, default=1,
+                        help='Convert files in N worker processes, or replay the journal in N threads (0 means one per CPU core).')
+    parser.add_argument('--pipeline', '-P', action='store_true', default=False,
+                        help='Read and write files in threads while converting (prints utilization of the stages).')
+    parser.add_argument('--timeout', metavar='SECONDS', type=float, default=None,
+                        help='Supervise worker processes: cancel conversion of a file taking longer and quarantine the file (sources of quarantined files are left as they are, the report is written to the target folder).')
+    parser.add_argument('--memory-budget', metavar='MB', type=int, default=None,
+                        help='Supervise worker processes: quarantine a file whose conversion needs more memory (on systems with resource limits).')
+    parser.add_argument('--format', '-f', action='store_true', default=False,
+                        help='Indent and space the output code, instead of running clang-format over it.')
+    parser.add_argument('--stream', action='store_true', default=False,
+                        help='Read sources in chunks and pass tokens through the converting stages one by one, so memory stays bounded on huge files.')
+    parser.add_argument('--fast-path', action='store_true', default=False,
+                        help='Copy files with nothing to convert (no Obj-C code, no identifiers of the tables) found by a quick scan, headers get #pragma once only (prints how many files took it and the time saved).')
+    parser.add_argument('--changed', metavar='FILE', action='append', default=[],
+                        help='Convert only changed file and the files importing it directly or not, imported files first (import graph is cached in the target folder, can be repeated).')
+    parser.add_argument('--shard', metavar='K/N', type=shard_tools.parse_shard, default=None,
+                        help='Convert only part K of N of the found files, balanced by size and the same on every machine (shard manifest is written to the target folder).')
+    parser.add_argument('--merge-shards', action='store_true', default=False,
+                        help='Combine shard manifests collected in pointed folder and check that every file was converted exactly once (ignore other flags).')
+    parser.add_argument('--archive', metavar='OUT', type=str, default=None,
+                        help='Convert sources of pointed tar or zip archive into archive OUT, other members are copied (no files are extracted).')
+    parser.add_argument('--watch', '-w', action='store_true', default=False,
+                        help='Keep running and convert sources again whenever they are saved.')
+    parser.add_argument('--watch-method', choices=watch_tools.WATCH_METHODS, default='auto',
+                        help='How saved sources are found (default: %(default)s, inotify if available).')
+    parser.add_argument('--incremental', '-i', action='store_true', default=False,
+                        help='Skip files unchanged since the previous run (manifest is kept in the target folder).')
+    parser.add_argument('--profile', '-p', action='store_true', default=False,
+                        help='Print time spent in every lexer rule per file and for the whole run.')
+    parser.add_argument('--metrics', metavar='FILE', type=str, default=None,
+                        help='Write per-file time, sizes and counts of tokens, Obj-C calls and translated identifiers with run totals and latency percentiles to JSON file, print the run summary.')
+    parser.add_argument('--class-index', '-x', action='store_true', default=False,
+                        help='Tell static calls from instance ones by classes declared in the headers of the target (index is cached in the target folder).')
+    parser.add_argument('--pack', metavar='FILE', action='append', default=[],
+                        help='JSON mapping pack extending the conversion tables, later packs win (can be repeated, with --optimize compiled tables are cached with the lexer ones).')
+    parser.add_argument('--engine', '-e', choices=to2dx.ENGINES, default='ply',
+                        help='Tokenizer engine (default: %(default)s, the reference one).')
+    parser.add_argument('--optimize', '-O', action='store_true', default=False,
+                        help='Reuse cached lexer tables and compiled packs instead of rebuilding them on start.')
+    parser.add_argument('--lextab-dir', metavar='DIR', type=str, default=to2dx.LEXTAB_DIR,
+                        help='Folder for cached lexer tables (default: %(default)s).')
     args = parser.parse_args()
+    if (args.header or args.framed) and args.path[0] != '-':
+        parser.error('--header and --framed convert standard input, give - path')
+    if args.pipeline and args.jobs != 1:
+        parser.error('--pipeline converts in a single thread, it can not be used with --jobs')
+    if args.stream and (args.pipeline or args.profile):
+        parser.error('--stream reads files in chunks, it can not be used with --pipeline or --profile')
+    if args.fast_path and (args.stream or args.path[0] == '-'):
+        parser.error('--fast-path scans whole files, it can not be used with --stream or - path')
+    if (args.timeout or args.memory_budget) and (args.watch or args.pipeline or args.archive):
+        parser.error('--timeout and --memory-budget supervise worker processes, they can not be used with --watch, --pipeline or --archive')
+    if args.shard and (args.watch or args.incremental):
+        parser.error('--shard converts its part of files once, it can not be used with --watch or --incremental')
+    if args.archive:
+        if args.watch or args.incremental or args.shard or args.journal or args.stream or args.pipeline or args.jobs != 1 or args.class_index:
+            parser.error('--archive converts members one by one, it can not be used with --watch, --incremental, --shard, --journal, --stream, --pipeline, --jobs or --class-index')
+        for archive_name in (args.path[0], args.archive):
+            if not archive_tools.is_archive(archive_name):
+                parser.error('%s is not a tar or zip archive' % archive_name)
+    if args.merge_shards:
+        converted, problems = shard_tools.merge_shards(shard_tools.get_root(args.path[0]))
+        for problem in problems:
+            print problem
+        print '%d file(s) converted, %d problem(s)' % (converted, len(problems))
+        sys.exit(1 if problems else 0)
+    journal = journal_tools.Journal(journal_tools.get_journal_name(args.path[0]))
     if args.rollback:
-        file_tools.rollback(args.path[0], args.subfolders)
+        if args.journal and journal.exists():
+            journal_tools.rollback(journal, args.subfolders, args.exclude, convert_tools.get_jobs(args))
+        else:
+            file_tools.rollback(args.path[0], args.subfolders, args.exclude)
         quit()
     elif args.remove_backup:
-        file_tools.remove_backup(args.path[0], args.subfolders)
+        if args.journal and journal.exists():
+            journal_tools.remove_backup(journal, args.subfolders, args.exclude, convert_tools.get_jobs(args))
+        else:
+            file_tools.remove_backup(args.path[0], args.subfolders, args.exclude)
         quit()
-    file_list = file_tools.get_file_list(args.path[0], args.subfolders)
-    if not file_list:
+    try:
+        convert_tools.load_packs(args)
+    except (IOError, ValueError) as exc:
+        parser.error(str(exc))
+    if args.path[0] == '-':
+        convert_tools.process_stdio(args)
         quit()
-    cocos_lexer = CocosLexer()
-    cocos_lexer.build()
-    cocos_lexer.init_version(args.second)
-    for fname in file_list:
-        cocos_lexer.feed_from_file(fname)
-        if args.debug:
+    if args.archive:
+        args.class_names = None
+        results = convert_tools.process_archive(args.path[0], args.archive, args)
+        pipeline = shard_manifest = quarantine = None
+    else:
+        # files are converted while the rest of the tree is being searched
+        file_list = file_tools.iter_files(args.path[0], args.subfolders, args.include, args.exclude)
+        if args.changed:
+            file_list = iter(deps_tools.affected_files(args.path[0], args.subfolders, args.changed, args.include, args.exclude, convert_tools.get_jobs(args)))
+        shard_manifest = None
+        if args.shard:
+            shard_manifest = shard_tools.ShardManifest(args.path[0], args.shard[0], args.shard[1], file_list)
+            # an empty shard is recorded too
+            shard_manifest.save()
+            file_list = iter(shard_manifest.files)
+        first_file = next(file_list, None)
+        if first_file is None and not args.watch:
+            quit()
+        args.class_names = index_tools.load_class_names(args.path[0], args.subfolders, args.exclude, convert_tools.get_jobs(args)) \
+            if args.class_index else None
+        if args.debug and first_file is not None:
+            cocos_lexer = convert_tools.make_lexer(args.second, convert_tools.get_lextab_dir(args), args.engine)
+            cocos_lexer.class_names = args.class_names
+            cocos_lexer.feed_from_file(first_file)
             cocos_lexer.console_output2()
-            break
-        if args.backup:
-            file_tools.make_backup(fname)
-        cocos_lexer.file_output(file_tools.get_cpp_file_name_with_remove(fname))
-        cocos_lexer.refresh()
-        
\ No newline at end of file
+            quit()
+        file_list = itertools.chain([first_file] if first_file is not None else [], file_list)
+        pipeline = pipeline_tools.Pipeline() if args.pipeline else None
+        manifest_name = manifest_tools.get_manifest_name(args.path[0])
+        quarantine = supervise_tools.Quarantine(supervise_tools.get_quarantine_name(args.path[0])) \
+            if args.timeout or args.memory_budget else None
+        if args.incremental:
+            results = convert_tools.process_incremental(file_list, args, manifest_name, pipeline, quarantine)
+        else:
+            results = convert_tools.process_files(file_list, args, pipeline, quarantine)
+    run_profile = profile_tools.RuleProfile() if args.profile else None
+    run_metrics = metrics_tools.RunMetrics() if args.metrics or args.fast_path else None
+
+    def handle(result):
+        """Records and reports converted file."""
+        if args.journal:
+            journal.record(result)
+        if run_profile is not None and 'profile' in result:
+            file_profile = profile_tools.RuleProfile()
+            file_profile.merge(result['profile'])
+            print file_profile.report(result['file'])
+            run_profile.merge(result['profile'])
+        if run_metrics is not None:
+            run_metrics.add(result)
+        if shard_manifest is not None:
+            shard_manifest.record(result)
+
+    try:
+        for result in results:
+            handle(result)
+        if run_profile is not None:
+            print run_profile.report('Total')
+        if pipeline is not None:
+            print pipeline.report()
+        if args.metrics:
+            print run_metrics.report()
+        if args.fast_path:
+            print run_metrics.fast_path_report()
+        if args.watch:
+            watcher = watch_tools.make_watcher(args.watch_method, args.path[0], args.subfolders, args.include, args.exclude)
+            print 'Watching %s (%s), press Ctrl+C to stop.' % (args.path[0], type(watcher).__name__)
+            try:
+                for result in convert_tools.process_changes(watcher, args, manifest_name):
+                    print '%s -> %s (%.1f ms)' % (result['file'], result['output'], result['seconds'] * 1000)
+                    handle(result)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                watcher.close()
+    finally:
+        journal.close()
+        if args.metrics:
+            run_metrics.save(args.metrics)
+        if shard_manifest is not None:
+            shard_manifest.save()
+        if quarantine is not None:
+            for line in quarantine.report():
+                print line
+            quarantine.save()
+    if quarantine is not None and quarantine.files:
+        sys.exit(1)
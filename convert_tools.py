@@ -0,0 +1,462 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Batch conversion tools for Cocos2d to Cocos2d-x converter."""
+
+import multiprocessing
+import os
+import sys
+import threading
+from timeit import default_timer
+import archive_tools
+import file_tools
+import filter_tools
+import format2dx
+import manifest_tools
+import metrics_tools
+import pack_tools
+import prescan2dx
+import stream2dx
+import supervise_tools
+from profile_tools import RuleProfile
+from to2dx import CocosLexer
+
+# files sent to a worker at once
+CHUNK_SIZE = 8
+
+# target name : Cocos2d-x-2 flag
+TARGETS = {'v2': True, 'v3': False}
+
+class ConversionError(Exception):
+    """Failure of converting file in a worker process, it is made of the
+    original exception, which may not be passed between processes."""
+
+def get_lextab_dir(args):
+    """Returns folder for cached lexer tables or None."""
+    return args.lextab_dir if args.optimize else None
+
+def load_packs(args):
+    """Installs mapping packs of the options, their compiled tables are
+    cached with the lexer ones if they are."""
+    pack_tools.load_packs(args.pack, get_lextab_dir(args))
+
+def make_lexer(v2_flag, cache_dir=None, engine='ply'):
+    """Returns built lexer for the target version."""
+    cocos_lexer = CocosLexer()
+    cocos_lexer.build(cache_dir=cache_dir, engine=engine)
+    cocos_lexer.init_version(v2_flag)
+    return cocos_lexer
+
+def setup_lexer(args):
+    """Returns lexer for the options and its profile (None if disabled).
+
+    In the stream mode it is StreamConverter of the lexer.
+    """
+    cocos_lexer = make_lexer(args.second, get_lextab_dir(args), args.engine)
+    cocos_lexer.class_names = args.class_names
+    if args.stream:
+        return stream2dx.StreamConverter(cocos_lexer,
+                                         formatter=get_formatter(args)), None
+    profile = RuleProfile().attach(cocos_lexer) if args.profile else None
+    return cocos_lexer, profile
+
+def get_formatter(args):
+    """Returns formatter of the output or None if it is disabled."""
+    return format2dx.Formatter() if args.format else None
+
+def backup_and_remove(file_name, args, result):
+    """Backups (if enabled) and removes the source, returns output name."""
+    moved = False
+    if args.backup:
+        result['backup'] = file_tools.make_backup(file_name, args.backup_mode)
+        moved = args.backup_mode == 'rename'
+    return file_tools.get_cpp_file_name_with_remove(file_name, not moved)
+
+def render(cocos_lexer, result, profile=None, formatter=None):
+    """Returns code of the fed lexer, its profile is stored in result."""
+    if profile is None:
+        return cocos_lexer.render(formatter)
+    profile.reset()
+    start = default_timer()
+    code = cocos_lexer.render(formatter)
+    profile.add_total(default_timer() - start)
+    result['profile'] = profile.snapshot()
+    return code
+
+def fast_path(cocos_lexer, text, is_header, result):
+    """Returns output of text copied by the fast path (see prescan2dx),
+    None if it needs the lexer."""
+    if not prescan2dx.is_trivial(text, is_header, cocos_lexer.to2dx_func):
+        return None
+    result['fast_path'] = True
+    return prescan2dx.copy_code(text, is_header)
+
+def process_file(cocos_lexer, file_name, args, profile=None):
+    """Converts one file: backup, output and removal of the source.
+
+    Returns dictionary with the source, backup and output names, and
+    metrics of the file if they are enabled.
+    """
+    start = default_timer()
+    result = {'file': file_name}
+    if args.incremental:
+        result['source'] = manifest_tools.fingerprint(file_name)
+    measured = args.metrics or args.fast_path
+    bytes_in = os.path.getsize(file_name) if measured else None
+    if args.stream:
+        stream_file(cocos_lexer, file_name, args, result)
+    else:
+        convert_whole(cocos_lexer, file_name, args, result, profile)
+    if measured:
+        result['metrics'] = metrics_tools.file_metrics(
+            cocos_lexer, bytes_in, os.path.getsize(result['output']),
+            default_timer() - start, result.get('fast_path', False))
+    cocos_lexer.refresh()
+    return result
+
+def convert_whole(cocos_lexer, file_name, args, result, profile=None):
+    """Converts file read at once, trivial files take the fast path if
+    it is enabled."""
+    code = None
+    if args.fast_path:
+        is_header = file_tools.is_header(file_name)
+        with open(file_name, 'r') as in_file:
+            text = in_file.read()
+        code = fast_path(cocos_lexer, text, is_header, result)
+        if code is None:
+            cocos_lexer.feed(text)
+            cocos_lexer.is_header = is_header
+    else:
+        cocos_lexer.feed_from_file(file_name)
+    if code is None:
+        # the whole input is lexed before the source is removed and the
+        # output file is opened, so the source is intact if it fails and
+        # writing over the mapped source file is safe
+        code = render(cocos_lexer, result, profile, get_formatter(args))
+    result['output'] = backup_and_remove(file_name, args, result)
+    with open(result['output'], 'w') as out:
+        out.write(code)
+
+def get_part_name(file_name):
+    """Returns name of the output written aside by stream_file."""
+    return file_tools.get_cpp_file_name_with_remove(file_name, False) + \
+        '.part'
+
+def remove_part(file_name):
+    """Removes output left aside by stream_file killed in a worker, with
+    the temporary file of file_tools.write_file."""
+    folder, part_name = os.path.split(get_part_name(file_name))
+    for name in os.listdir(folder or os.curdir):
+        if name == part_name or name.startswith(part_name + '.') and \
+                name.endswith('.tmp'):
+            os.remove(os.path.join(folder, name))
+
+def stream_file(converter, file_name, args, result):
+    """Converts file by StreamConverter, the source is read in chunks
+    while the output is written."""
+    # the output is written aside and replaces the source only when it is
+    # complete, so the source is intact if the conversion fails
+    part_name = get_part_name(file_name)
+    with open(file_name, 'r') as in_file:
+        file_tools.write_file(part_name, converter.convert(
+            stream2dx.read_chunks(in_file), file_tools.is_header(file_name)))
+    result['output'] = backup_and_remove(file_name, args, result)
+    file_tools.replace_file(part_name, result['output'])
+
+def process_archive(in_name, out_name, args):
+    """Converts sources of tar or zip archive into another archive, yields
+    results like process_file. Other members are copied, backups are
+    added as members too."""
+    cocos_lexer, profile = setup_lexer(args)
+    formatter = get_formatter(args)
+    with archive_tools.ArchiveWriter(out_name) as writer:
+        for member in archive_tools.read_members(in_name):
+            if member.data is None or not archive_tools.is_selected(
+                    member.name, args.subfolders, args.include, args.exclude):
+                writer.add(member)
+                continue
+            start = default_timer()
+            result = {'file': member.name}
+            is_header = file_tools.is_header(member.name)
+            code = fast_path(cocos_lexer, member.data, is_header, result) \
+                if args.fast_path else None
+            if code is None:
+                cocos_lexer.feed(member.data)
+                cocos_lexer.is_header = is_header
+                code = render(cocos_lexer, result, profile, formatter)
+            if args.backup:
+                result['backup'] = member.name + '.bak'
+                writer.add(member, result['backup'])
+            result['output'] = file_tools.get_cpp_file_name_with_remove(
+                member.name, False)
+            writer.add(member, result['output'], code)
+            if args.metrics or args.fast_path:
+                result['metrics'] = metrics_tools.file_metrics(
+                    cocos_lexer, len(member.data), len(code),
+                    default_timer() - start, result.get('fast_path', False))
+            cocos_lexer.refresh()
+            yield result
+
+def process_stdio(args):
+    """Converts standard input to standard output, framed documents in
+    the framed mode (see filter_tools)."""
+    cocos_lexer = make_lexer(args.second, get_lextab_dir(args), args.engine)
+    converter = stream2dx.StreamConverter(cocos_lexer,
+                                          formatter=get_formatter(args))
+    filter_tools.binary_stdio()
+    if args.framed:
+        filter_tools.serve_frames(converter, sys.stdin, sys.stdout,
+                                  args.header)
+    else:
+        filter_tools.convert_stream(converter, sys.stdin, sys.stdout,
+                                    args.header)
+
+##################
+# Library usage. #
+##################
+# (target, engine) : built lexer which is only cloned, never fed
+_prototypes = {}
+_prototypes_lock = threading.Lock()
+
+def get_prototype(target, engine='ply'):
+    """Returns shared lexer of the target, it is built by the first call."""
+    if target not in TARGETS:
+        raise ValueError('Unknown target %r, use one of: %s' % (
+            target, ', '.join(sorted(TARGETS))))
+    with _prototypes_lock:
+        if (target, engine) not in _prototypes:
+            _prototypes[target, engine] = make_lexer(TARGETS[target],
+                                                     engine=engine)
+        return _prototypes[target, engine]
+
+def convert_source(text, is_header, target='v3', engine='ply',
+                   class_names=None, formatted=False):
+    """Returns converted code of Obj-C source text.
+
+    Every call works with its own clone of the shared lexer, so it can be
+    made repeatedly and from several threads. class_names are classes of
+    the project index (see index_tools), formatted code is indented and
+    spaced by format2dx.
+    """
+    cocos_lexer = get_prototype(target, engine).clone()
+    cocos_lexer.class_names = class_names
+    cocos_lexer.feed(text)
+    cocos_lexer.is_header = is_header
+    return cocos_lexer.render(format2dx.Formatter() if formatted else None)
+
+def convert_file(file_name, target='v3', engine='ply', class_names=None,
+                 formatted=False):
+    """Returns converted code of file, nothing is written or removed."""
+    cocos_lexer = get_prototype(target, engine).clone()
+    cocos_lexer.class_names = class_names
+    cocos_lexer.feed_from_file(file_name)
+    return cocos_lexer.render(format2dx.Formatter() if formatted else None)
+
+def stream_converter(target='v3', engine='ply', class_names=None,
+                     stages=(), formatted=False):
+    """Returns StreamConverter of the shared lexer with extra stages.
+
+    Its convert(chunks, is_header) yields pieces of converted code, see
+    stream2dx for the stages.
+    """
+    cocos_lexer = get_prototype(target, engine).clone()
+    cocos_lexer.class_names = class_names
+    return stream2dx.StreamConverter(
+        cocos_lexer, stages, format2dx.Formatter() if formatted else None)
+
+###################
+# Worker process. #
+###################
+_worker_lexer = None
+_worker_profile = None
+_worker_args = None
+
+def init_worker(args):
+    """Builds the lexer once per worker process."""
+    # pylint: disable=global-statement
+    global _worker_lexer, _worker_profile, _worker_args
+    _worker_args = args
+    load_packs(args)
+    _worker_lexer, _worker_profile = setup_lexer(args)
+
+def convert_in_worker(file_name):
+    """Converts file using the worker's lexer, which is refreshed if
+    it fails."""
+    try:
+        return process_file(_worker_lexer, file_name, _worker_args,
+                            _worker_profile)
+    except Exception:
+        _worker_lexer.refresh()
+        raise
+
+def process_in_worker(file_name):
+    """Converts file in a worker of the pool, its failures are passed
+    to the parent process as ConversionError."""
+    try:
+        return convert_in_worker(file_name)
+    except Exception as exc:
+        raise ConversionError('%s: %s: %s' % (file_name,
+                                               type(exc).__name__, exc))
+
+###############
+# Processing. #
+###############
+def get_jobs(args):
+    """Returns count of worker processes (0 means all cores)."""
+    return max(args.jobs or multiprocessing.cpu_count(), 1)
+
+def process_serial(file_list, args):
+    """Converts files one by one with a single lexer."""
+    cocos_lexer, profile = setup_lexer(args)
+    for fname in file_list:
+        yield process_file(cocos_lexer, fname, args, profile)
+
+def prepare_workers(args):
+    """Makes what worker processes share before they start."""
+    if args.optimize and args.engine == 'ply':
+        # write the tables once instead of in every worker
+        CocosLexer().build(cache_dir=get_lextab_dir(args))
+
+def process_parallel(file_list, args, jobs):
+    """Converts files in the pool of worker processes."""
+    prepare_workers(args)
+    pool = multiprocessing.Pool(jobs, init_worker, (args,))
+    try:
+        for result in pool.imap_unordered(process_in_worker, file_list,
+                                          CHUNK_SIZE):
+            yield result
+        pool.close()
+    except BaseException:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+#####################
+# Pipelined stages. #
+#####################
+def read_stage(file_name, args):
+    """Reads the source, returns result with its text."""
+    result = {'file': file_name}
+    if args.metrics or args.fast_path:
+        result['start'] = default_timer()
+    if args.incremental:
+        result['source'] = manifest_tools.fingerprint(file_name)
+    with open(file_name, 'r') as in_file:
+        result['text'] = in_file.read()
+    return result
+
+def convert_stage(cocos_lexer, result, profile=None, formatter=None,
+                  with_fast_path=False):
+    """Converts text of the result to code, trivial text takes the fast
+    path with with_fast_path."""
+    text = result.pop('text')
+    is_header = file_tools.is_header(result['file'])
+    code = fast_path(cocos_lexer, text, is_header, result) \
+        if with_fast_path else None
+    if code is None:
+        cocos_lexer.feed(text)
+        cocos_lexer.is_header = is_header
+        code = render(cocos_lexer, result, profile, formatter)
+    result['code'] = code
+    if 'start' in result:
+        # the output size and latency are known after writing
+        result['metrics'] = {'bytes_in': len(text),
+                             'tokens': cocos_lexer.token_count,
+                             'objc_calls': cocos_lexer.objc_calls,
+                             'translated': cocos_lexer.translated,
+                             'fast_path': result.get('fast_path', False)}
+    cocos_lexer.refresh()
+    return result
+
+def write_stage(result, args):
+    """Backups and removes the source, writes code of the result."""
+    result['output'] = backup_and_remove(result['file'], args, result)
+    with open(result['output'], 'w') as out:
+        out.write(result.pop('code'))
+    if 'start' in result:
+        result['metrics']['bytes_out'] = os.path.getsize(result['output'])
+        result['metrics']['seconds'] = default_timer() - result.pop('start')
+    return result
+
+def process_pipelined(file_list, args, pipeline):
+    """Converts files while the next ones are read and the previous ones
+    are written in other threads."""
+    cocos_lexer, profile = setup_lexer(args)
+    formatter = get_formatter(args)
+    pipeline.add('read', lambda fname: read_stage(fname, args))
+    pipeline.add('convert', lambda result: convert_stage(
+        cocos_lexer, result, profile, formatter, args.fast_path))
+    pipeline.add('write', lambda result: write_stage(result, args))
+    return pipeline.run(file_list)
+
+def process_supervised(file_list, args, quarantine):
+    """Converts files in supervised worker processes, files failing or
+    exceeding the time or memory budget are added to quarantine."""
+    prepare_workers(args)
+    supervisor = supervise_tools.Supervisor(
+        get_jobs(args), args.timeout,
+        args.memory_budget and args.memory_budget << 20, init_worker,
+        (args,))
+    for fname, result, reason, seconds in supervisor.run(convert_in_worker,
+                                                         file_list):
+        if reason is None:
+            yield result
+        else:
+            if args.stream:
+                remove_part(fname)
+            quarantine.add(fname, reason, seconds)
+
+def process_files(file_list, args, pipeline=None, quarantine=None):
+    """Converts files, yields results of process_file. With quarantine
+    (see supervise_tools) workers are supervised."""
+    if quarantine is not None:
+        return process_supervised(file_list, args, quarantine)
+    if pipeline is not None:
+        return process_pipelined(file_list, args, pipeline)
+    jobs = get_jobs(args)
+    if jobs == 1:
+        return process_serial(file_list, args)
+    return process_parallel(file_list, args, jobs)
+
+def process_changes(watcher, args, manifest_name=None):
+    """Converts sources written after the previous run with the lexer
+    kept built, yields results until interrupted."""
+    cocos_lexer, profile = setup_lexer(args)
+    manifest = manifest_tools.Manifest(manifest_name, args.second,
+                                       args.class_names, args.fast_path,
+                                       args.format) \
+        if args.incremental else None
+    for file_list in watcher.changes():
+        for fname in file_list:
+            start = default_timer()
+            try:
+                result = process_file(cocos_lexer, fname, args, profile)
+            except (IOError, OSError):
+                cocos_lexer.refresh()
+                continue  # removed or being replaced, the next event comes
+            watcher.written(result['output'])
+            result['seconds'] = default_timer() - start
+            if manifest is not None:
+                manifest.record(result['file'], result['source'],
+                                result['output'])
+            yield result
+        if manifest is not None:
+            manifest.save()
+
+def process_incremental(file_list, args, manifest_name, pipeline=None,
+                        quarantine=None):
+    """Converts files which were changed since the previous run."""
+    manifest = manifest_tools.Manifest(manifest_name, args.second,
+                                       args.class_names, args.fast_path,
+                                       args.format)
+    # the manifest is checked here, not in the threads consuming files
+    changed = [fname for fname in file_list
+               if not manifest.is_unchanged(fname)]
+    try:
+        for result in process_files(changed, args, pipeline, quarantine):
+            manifest.record(result['file'], result['source'],
+                            result['output'])
+            yield result
+    finally:
+        manifest.save()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Dependency graph of the target files by their #import directives.
+
+Imports are scanned by a regular expression like the one of the lexer
+IMPORT rule (#include of already converted files too). The scanned names
+are cached in the target folder like the class index and resolved to
+files when the graph is used: relative to the importing file first, then
+by the end of the path anywhere in the tree, system headers are left
+out. Given changed files, the graph yields every file importing them
+directly or through other files, headers before the files importing them.
+"""
+
+import heapq
+import os
+import re
+import file_tools
+from index_tools import FileIndex
+
+DEPS_NAME = '.c2dx_deps.json'
+DEPS_VERSION = 1
+
+_IMPORT_RE = re.compile(
+    r'^[ \t]*\#[ \t]*(?:import|include)[ \t]*[<"]([^>"\n]+)[>"]', re.M)
+
+def get_deps_name(file_or_folder):
+    """Returns graph file name for the target file or folder."""
+    folder = file_or_folder if os.path.isdir(file_or_folder) \
+        else os.path.dirname(file_or_folder)
+    return os.path.join(folder, DEPS_NAME)
+
+def scan_imports(code):
+    """Returns names imported by code in their order."""
+    names = []
+    for name in _IMPORT_RE.findall(code):
+        name = name.strip()
+        if name not in names:
+            names.append(name)
+    return names
+
+def scan_file(file_name):
+    """Returns (file name, graph record) of file."""
+    with open(file_name, 'rb') as in_file:
+        stat = os.fstat(in_file.fileno())
+        code = in_file.read()
+    return file_name, {'size': stat.st_size, 'mtime': stat.st_mtime,
+                       'imports': scan_imports(code)}
+
+class DependencyGraph(FileIndex):
+    """Imports of the target folder files with their fingerprints."""
+    version = DEPS_VERSION
+    scan = staticmethod(scan_file)
+
+    def _resolve(self):
+        """Returns {file key: keys of files it imports}."""
+        by_name = {}
+        for key in self._files:
+            by_name.setdefault(os.path.basename(key), []).append(key)
+        graph = {}
+        for key, record in self._files.items():
+            folder = os.path.dirname(key)
+            imported = set()
+            for name in record['imports']:
+                local = os.path.normpath(os.path.join(folder, name))
+                if local in self._files:
+                    imported.add(local)
+                    continue
+                path = os.path.normpath(name)
+                for other in by_name.get(os.path.basename(path), ()):
+                    if other == path or other.endswith(os.sep + path):
+                        imported.add(other)
+            imported.discard(key)
+            graph[key] = imported
+        return graph
+
+    def dependents(self, file_list):
+        """Returns keys of files and of all files importing them."""
+        keys = set(self._key(fname) for fname in file_list)
+        # removed files are found by the names they were imported by
+        missing = set(os.path.basename(key) for key in keys
+                      if key not in self._files)
+        importers = {}
+        for key, imported in self._resolve().items():
+            for other in imported:
+                importers.setdefault(other, []).append(key)
+            if missing and any(os.path.basename(name) in missing
+                               for name in self._files[key]['imports']):
+                keys.add(key)
+        stack = list(keys)
+        while stack:
+            for other in importers.get(stack.pop(), ()):
+                if other not in keys:
+                    keys.add(other)
+                    stack.append(other)
+        return set(key for key in keys if key in self._files)
+
+    def order(self, keys):
+        """Returns keys with the imported files before the importing ones,
+        import cycles are broken by the fewest pending imports."""
+        graph = self._resolve()
+        keys = set(keys)
+        pending = dict((key, graph.get(key, set()) & keys) for key in keys)
+        importers = {}
+        for key, imported in pending.items():
+            for other in imported:
+                importers.setdefault(other, []).append(key)
+        ready = [key for key, imported in pending.items() if not imported]
+        heapq.heapify(ready)
+        ordered = []
+        while pending:
+            if not ready:
+                key = min(pending, key=lambda key: (len(pending[key]), key))
+                pending[key] = set()
+                ready.append(key)
+            key = heapq.heappop(ready)
+            del pending[key]
+            ordered.append(key)
+            for other in importers.get(key, ()):
+                imported = pending.get(other)
+                if imported and key in imported:
+                    imported.discard(key)
+                    if not imported:
+                        heapq.heappush(ready, other)
+        return ordered
+
+    def file_name(self, key):
+        """Returns file name of key."""
+        # keys of the loaded graph are decoded by json
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        return os.path.join(self._prefix, key)
+
+def affected_files(file_or_folder, with_subfolders, changed, include=(),
+                   exclude=(), jobs=1):
+    """Updates cached graph of the target, returns files to convert after
+    the changed ones: they and the files importing them, which match
+    include patterns, headers first."""
+    graph = DependencyGraph(get_deps_name(file_or_folder))
+    graph.update(file_tools.iter_files(file_or_folder, with_subfolders,
+                                       exclude=exclude), jobs)
+    graph.save()
+    file_list = [graph.file_name(key)
+                 for key in graph.order(graph.dependents(changed))]
+    if include:
+        selected = set(file_tools.iter_files(file_or_folder, with_subfolders,
+                                             include, exclude))
+        file_list = [fname for fname in file_list if fname in selected]
+    return file_list
@@ -4,12 +4,22 @@
 """Helpful tools for file processing for Cocos2d to Cocos2d-x parser."""
 
 import os
+from fnmatch import fnmatch
 from shutil import copy2
 
+try:
+    from os import scandir
+except ImportError:  # Python 2 without the scandir backport
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
 HEADER_FILES = ('.h',)
 SOURCE_FILES = ('.m', '.mm',)
 PROCESSABLE_FILES = HEADER_FILES + SOURCE_FILES
 BACKUPED_FILES = tuple((i + '.bak' for i in PROCESSABLE_FILES))
+BACKUP_MODES = ('copy', 'rename')
 
 def is_header(file_name):
     """Checks if file name is header's name."""
@@ -44,51 +54,138 @@ def is_backuped_file(file_name):
     """Checks if file name is a name of backuped file."""
     return str(file_name).endswith(BACKUPED_FILES)
 
-def make_backup(file_name):
-    """Makes backup for file."""
-    copy2(file_name, file_name + '.bak')
+def make_backup(file_name, mode='copy'):
+    """Makes backup for file, returns its name.
 
-def get_file_list(file_or_folder, with_subfolders):
-    """Returns file list to processing."""
-    if os.path.isfile(file_or_folder):
-        return [file_or_folder] if is_processable_file(file_or_folder) else []
-    elif os.path.isdir(file_or_folder):
-        file_list = []
-        if with_subfolders:
-            for path, _, files in os.walk(file_or_folder):
-                for name in files:
-                    if is_processable_file(name):
-                        file_list.append(os.path.join(path, name))
-        else:
-            for item in os.listdir(file_or_folder):
-                if is_processable_file(item):
-                    candidate = os.path.join(file_or_folder, item)
-                    if os.path.isfile(candidate):
-                        file_list.append(candidate)
-        return file_list
+    The rename mode moves the file itself to the backup, so the caller
+    must not remove it.
+    """
+    backup_name = file_name + '.bak'
+    if mode == 'rename':
+        if os.name == 'nt' and os.path.exists(backup_name):
+            os.remove(backup_name)
+        os.rename(file_name, backup_name)
     else:
-        return []
+        copy2(file_name, backup_name)
+    return backup_name
+
+def write_file(file_name, data, binary=False):
+    """Writes file through temporary one, so it is never seen half-written.
+
+    data is a string or an iterable of strings.
+    """
+    tmp_name = '%s.%d.tmp' % (file_name, os.getpid())
+    try:
+        with open(tmp_name, 'wb' if binary else 'w') as out:
+            if isinstance(data, basestring):
+                out.write(data)
+            else:
+                out.writelines(data)
+    except BaseException:
+        os.remove(tmp_name)
+        raise
+    replace_file(tmp_name, file_name)
+
+def replace_file(src, dst):
+    """Renames file src to dst, which is replaced if it exists."""
+    if os.name == 'nt' and os.path.exists(dst):
+        os.remove(dst)
+    os.rename(src, dst)
+
+class _Entry(object):
+    """Directory entry like os.scandir() gives, for Python without it."""
+    def __init__(self, folder, name):
+        """Entry creation."""
+        self.name = name
+        self.path = os.path.join(folder, name)
+
+    def is_dir(self):
+        """Checks if entry is a folder."""
+        return os.path.isdir(self.path)
+
+    def is_file(self):
+        """Checks if entry is a file."""
+        return os.path.isfile(self.path)
+
+    def is_symlink(self):
+        """Checks if entry is a symbolic link."""
+        return os.path.islink(self.path)
 
-def process_backups(folder_name, with_subfolders, function):
+def list_folder(folder):
+    """Returns entries of folder.
+
+    The whole folder is listed at once, because the caller may create and
+    remove files there while its entries are processed.
+    """
+    if scandir is None:
+        return [_Entry(folder, name) for name in os.listdir(folder)]
+    return list(scandir(folder))
+
+def matches(name, rel_path, patterns):
+    """Checks if file name or its path relative to the root folder
+    matches any of glob patterns."""
+    return any(fnmatch(name, pattern) or fnmatch(rel_path, pattern)
+               for pattern in patterns)
+
+def scan_folder(folder, rel_folder='', include=(), exclude=(),
+                accept=is_processable_file, with_subfolders=True):
+    """Returns accepted files of folder and (subfolder, its relative path)
+    pairs, rel_folder is the relative path of folder ending with '/'.
+
+    Files must be accepted and match include patterns if there are any,
+    files and folders matching exclude patterns are skipped.
+    """
+    files, subfolders = [], []
+    for entry in list_folder(folder):
+        rel_path = rel_folder + entry.name
+        if exclude and matches(entry.name, rel_path, exclude):
+            continue
+        # names are checked first, type of the entry may cost a stat
+        if accept(entry.name) and entry.is_file():
+            if not include or matches(entry.name, rel_path, include):
+                files.append(entry.path)
+        # linked folders are not entered like os.walk() does
+        elif with_subfolders and entry.is_dir() and not entry.is_symlink():
+            subfolders.append((entry.path, rel_path + '/'))
+    return files, subfolders
+
+def iter_files(file_or_folder, with_subfolders, include=(), exclude=(),
+               accept=is_processable_file):
+    """Yields files to processing as they are found (folder by folder,
+    excluded folders are not entered at all)."""
+    if os.path.isfile(file_or_folder):
+        if accept(file_or_folder):
+            yield file_or_folder
+        return
+    if not os.path.isdir(file_or_folder):
+        return
+    folders = [(file_or_folder, '')]
+    while folders:
+        folder, rel_folder = folders.pop()
+        files, subfolders = scan_folder(folder, rel_folder, include, exclude,
+                                        accept, with_subfolders)
+        for file_name in files:
+            yield file_name
+        # walk top-down in the listing order
+        folders.extend(reversed(subfolders))
+
+def get_file_list(file_or_folder, with_subfolders, include=(), exclude=()):
+    """Returns file list to processing."""
+    return list(iter_files(file_or_folder, with_subfolders, include,
+                           exclude))
+
+def process_backups(folder_name, with_subfolders, function, exclude=()):
     """Process backuped files using function."""
     if os.path.isdir(folder_name):
-        if with_subfolders:
-            for path, _, files in os.walk(folder_name):
-                for name in files:
-                    if is_backuped_file(name):
-                        file_name = os.path.join(path, name)
-                        function(file_name)
-        else:
-            for item in os.listdir(folder_name):
-                if is_backuped_file(item):
-                    candidate = os.path.join(folder_name, item)
-                    if os.path.isfile(candidate):
-                        function(candidate)
-
-def rollback(folder_name, with_subfolders):
+        for file_name in iter_files(folder_name, with_subfolders,
+                                    exclude=exclude, accept=is_backuped_file):
+            function(file_name)
+
+def rollback(folder_name, with_subfolders, exclude=()):
     """Restore parsed files from backup."""
-    process_backups(folder_name, with_subfolders, lambda x: copy2(x, x[:-4]))
+    process_backups(folder_name, with_subfolders, lambda x: copy2(x, x[:-4]),
+                    exclude)
 
-def remove_backup(folder_name, with_subfolders):
+def remove_backup(folder_name, with_subfolders, exclude=()):
     """Removes backup files."""
-    process_backups(folder_name, with_subfolders, os.remove)
+    process_backups(folder_name, with_subfolders, os.remove, exclude)
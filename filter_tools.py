@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Filter mode: Obj-C code on standard input, C++ code on standard output.
+
+A single document is the whole input, its output is written while its
+tokens are converted. In the framed mode one process converts documents
+sent one after another over the same pipe:
+
+    request   '<size>\\n', '<size> header\\n' or '<size> source\\n' line
+              and size bytes of Obj-C code
+    response  chunks of C++ code as '<size>\\n' line and size bytes, then
+              '0\\n' line, or 'error <size>\\n' line and the message if
+              the conversion failed (the chunks before it are not valid)
+
+Requests are answered in order until the input ends. The response is
+written while the document is read, so a client must read it while it
+sends documents bigger than the pipe buffer.
+"""
+
+import os
+import sys
+import stream2dx
+
+# bytes of output sent in one chunk of the framed mode
+FRAME_CHUNK_SIZE = 1 << 16
+
+# request words : header flag
+DOCUMENT_KINDS = {'header': True, 'source': False}
+
+def binary_stdio():
+    """Switches standard input and output to binary mode on Windows."""
+    if os.name == 'nt':
+        import msvcrt
+        for stream in (sys.stdin, sys.stdout):
+            msvcrt.setmode(stream.fileno(), os.O_BINARY)
+
+def convert_stream(converter, in_file, out_file, is_header=False):
+    """Converts the whole input by StreamConverter to the output."""
+    out_file.writelines(converter.convert(stream2dx.read_chunks(in_file),
+                                          is_header))
+    out_file.flush()
+
+def read_frame(in_file, size, chunk_size=stream2dx.CHUNK_SIZE):
+    """Yields chunks of the next size bytes of input."""
+    while size > 0:
+        chunk = in_file.read(min(size, chunk_size))
+        if not chunk:
+            raise EOFError('input ends inside a document')
+        size -= len(chunk)
+        yield chunk
+
+def join_pieces(pieces, size=FRAME_CHUNK_SIZE):
+    """Yields pieces of text joined into chunks of at least size bytes,
+    the last one may be shorter."""
+    joined, length = [], 0
+    for piece in pieces:
+        joined.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield ''.join(joined)
+            joined, length = [], 0
+    if length:
+        yield ''.join(joined)
+
+def parse_request(line, is_header=False):
+    """Returns (size, header flag) of request line, is_header is the
+    default flag."""
+    words = line.split()
+    if not words or len(words) > 2 or not words[0].isdigit() or \
+            words[1:] and words[1] not in DOCUMENT_KINDS:
+        raise ValueError('Bad request line %r, expected "<size>[ header|'
+                         ' source]"' % line)
+    return int(words[0]), DOCUMENT_KINDS[words[1]] if words[1:] \
+        else is_header
+
+def serve_frames(converter, in_file, out_file, is_header=False):
+    """Converts framed documents of the input until it ends, is_header is
+    the default kind of documents."""
+    for line in iter(in_file.readline, ''):
+        if not line.strip():
+            continue
+        size, header = parse_request(line, is_header)
+        frames = read_frame(in_file, size)
+        try:
+            for chunk in join_pieces(converter.convert(frames, header)):
+                out_file.write('%d\n%s' % (len(chunk), chunk))
+                out_file.flush()
+        except EOFError:
+            raise
+        except Exception as exc:  # pylint: disable=broad-except
+            # the rest of the document is skipped
+            for _ in frames:
+                pass
+            message = '%s: %s' % (type(exc).__name__, exc)
+            out_file.write('error %d\n%s' % (len(message), message))
+        else:
+            out_file.write('0\n')
+        out_file.flush()
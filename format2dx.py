@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Formatting of converted tokens: spacing and indentation in one pass.
+
+Tokens are joined by single spaces except around member access, scope,
+parentheses, brackets, commas and unary operators. Lines are indented by
+the braces of the code, closing braces are dedented and lines inside
+unclosed parentheses are continued by one more level. Preprocessor
+directives start the line.
+"""
+
+# token types passed as they are, braces inside them are not code
+OPAQUE_TYPES = frozenset(['STRING', 'CHAR', 'SLCOMMENT', 'MLCOMMENT',
+                          'IMPORT', 'PRAGMAONCE', 'PRAGMA_ONCE',
+                          'PREPROCESSOR', 'PROPERTYPLUS', 'IMPLEMENTATION'])
+
+# token types starting the line without indentation
+DIRECTIVE_TYPES = frozenset(['IMPORT', 'PRAGMAONCE', 'PRAGMA_ONCE', 'DEFINE',
+                             'PREPROCESSOR'])
+
+# words followed by an expression, not operands themselves
+KEYWORDS = frozenset(['return', 'case', 'if', 'else', 'while', 'for', 'do',
+                      'switch', 'throw', 'new', 'delete', 'catch'])
+
+# words followed by ':' without space
+LABELS = frozenset(['public', 'protected', 'private', 'default'])
+
+# operators which may be unary, the first ones always are
+_UNARY = frozenset(['-', '+', '*', '&', '!', '~', '++', '--'])
+_ALWAYS_UNARY = frozenset(['!', '~'])
+
+# characters ending an operand
+_OPERAND_END = frozenset(
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_)]"\'')
+
+# traits of code token values, they repeat a lot
+_traits_cache = {}
+CACHE_SIZE = 1 << 16
+
+def is_operand(value):
+    """Checks if token value ends an operand."""
+    return value[-1] in _OPERAND_END and value not in KEYWORDS
+
+def code_part(value):
+    """Returns value without trailing comment."""
+    for mark in ('//', '/*'):
+        pos = value.find(mark)
+        if pos >= 0:
+            value = value[:pos]
+    return value
+
+def token_traits(value, opaque=False):
+    """Returns traits of token value: (glued to the previous token, glued
+    to the next one, opening parenthesis or bracket, operand, unary
+    operator if it follows no operand, label, output value, braces
+    change, parentheses change)."""
+    first, last = value[0], value[-1]
+    glued_before = first in ',;)]' or value.startswith(('->', '::')) or \
+        first == '.' and value != '...'
+    glued_after = last in '([.' or value.endswith(('->', '::'))
+    operand = is_operand(value)
+    unary = 2 if value in _ALWAYS_UNARY else int(value in _UNARY)
+    if opaque:
+        return (glued_before, glued_after, False, operand, unary, False,
+                value, 0, 0)
+    # tokens like '#define ' end with their space, the separator is added
+    value = value.rstrip() or value
+    # parts of converted tokens like '(Foo )' and '){'
+    if ' )' in value:
+        value = value.replace(' )', ')')
+    if last == '{' and len(value) > 1 and value[-2] != ' ':
+        value = value[:-1] + ' {'
+    code = code_part(value)
+    return (glued_before, glued_after, first in '([',
+            operand, unary, value in LABELS, value,
+            code.count('{') - code.count('}'),
+            code.count('(') + code.count('[') - code.count(')') -
+            code.count(']'))
+
+class Formatter(object):
+    """Formatter of converted tokens, braces are counted across lines."""
+    def __init__(self, indent='\t'):
+        """Formatter creation, indent is the text of one level."""
+        self.indent = indent
+        self.reset()
+
+    def reset(self):
+        """Forgets the braces of the previous code."""
+        # unclosed braces, parentheses and brackets
+        self._braces = 0
+        self._parens = 0
+        # count of tokens in the last output
+        self.token_count = 0
+
+    def format(self, tokens):
+        """Yields formatted lines of tokens with their ends."""
+        pieces = []
+        append = pieces.append
+        cache = _traits_cache
+        # traits of the previous token on the line, None at its start
+        prev = None
+        # previous token ends an operand, is unary operator
+        operand = unary = False
+        count = 0
+        for tok in tokens:
+            count += 1
+            tok_type, value = tok.type, tok.value
+            if tok_type == 'NEWLINE':
+                append(value)
+                yield ''.join(pieces)
+                del pieces[:]
+                prev = None
+                operand = unary = False
+                continue
+            if not value:
+                continue
+            if tok_type in OPAQUE_TYPES:
+                traits = token_traits(value, True)
+            else:
+                traits = cache.get(value)
+                if traits is None:
+                    if len(cache) >= CACHE_SIZE:
+                        cache.clear()
+                    traits = cache[value] = token_traits(value)
+            (glued_before, _, opening, ends_operand, unary_op, _, value,
+             braces, parens) = traits
+            if prev is None:
+                if tok_type not in DIRECTIVE_TYPES:
+                    level = self._braces + (self._parens > 0)
+                    if value[0] == '}':
+                        level -= 1
+                    append(self.indent * max(level, 0))
+            elif unary or glued_before or prev[1]:
+                pass
+            elif opening:
+                if not operand:
+                    append(' ')
+            elif not (unary_op and operand and value in ('++', '--') or
+                      value == ':' and prev[5]):
+                append(' ')
+            append(value)
+            unary = unary_op == 2 or unary_op and not operand
+            # postfix increment keeps the operand
+            operand = ends_operand or operand and not unary and \
+                value in ('++', '--')
+            if braces:
+                self._braces = max(self._braces + braces, 0)
+            if parens:
+                self._parens = max(self._parens + parens, 0)
+            prev = traits
+        self.token_count = count
+        if pieces:
+            yield ''.join(pieces)
+
+def format_tokens(tokens, indent='\t'):
+    """Yields formatted lines of tokens."""
+    return Formatter(indent).format(tokens)
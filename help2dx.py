@@ -3,8 +3,67 @@
 
 """Helpful tools for Cocos2d to Cocos2d-x translator."""
 from data2dx import *
+import hashlib
+import json
 import re
 
+# bound of memoized identifiers which are not in the tables
+MEMO_SIZE = 1 << 16
+
+# names of the conversion tables in data2dx, mapping packs extend them
+TABLE_NAMES = ('OBJC_TO_CPP', 'V2_TO_V3', 'DEPRECATED_V3', 'CC_MACROS',
+               'CREATE_METHODS', 'STATIC_METHODS', 'IGNORED_HEADERS')
+
+# (Cocos2d-x-2 flag, prefix flag) : {identifier : translation}
+_COMPILED = {}
+_TRANSLATIONS = {}
+# method name : fixed translation
+_METHODS = {}
+_IGNORED_HEADERS = set()
+_FORMAT_RE = re.compile(r'(?<!%)(%+)@')
+
+def compile_tables():
+    """Compiles the tables into flat lookups, drops memoized identifiers."""
+    names = set(OBJC_TO_CPP) | set(OBJC_TO_CPP.values()) | set(V2_TO_V3) | \
+        set(DEPRECATED_V3) | set(CC_MACROS)
+    for use_v2 in (True, False):
+        for prefix in (True, False):
+            compiled = dict((name, translate(name, prefix, use_v2))
+                            for name in names)
+            _COMPILED[use_v2, prefix] = compiled
+            _TRANSLATIONS[use_v2, prefix] = dict(compiled)
+    _METHODS.clear()
+    for method_name, static_name in STATIC_METHODS.items():
+        _METHODS[method_name] = '::' + static_name + '('
+    for method_name in CREATE_METHODS:  # they win over static ones
+        _METHODS[method_name] = '::create('
+    _IGNORED_HEADERS.clear()
+    _IGNORED_HEADERS.update(IGNORED_HEADERS)
+
+def get_tables():
+    """Returns the conversion tables by their names."""
+    return dict((name, globals()[name]) for name in TABLE_NAMES)
+
+def compiled_tables():
+    """Returns flat lookups compiled from the tables."""
+    return {'translations': _COMPILED, 'methods': _METHODS}
+
+def set_tables(tables, compiled=None):
+    """Replaces the conversion tables, compiles them unless lookups
+    given by compiled_tables() for the same tables are passed."""
+    globals().update((name, tables[name]) for name in TABLE_NAMES)
+    if compiled is None:
+        compile_tables()
+        return
+    _COMPILED.clear()
+    _COMPILED.update(compiled['translations'])
+    for key, compiled_table in _COMPILED.items():
+        _TRANSLATIONS[key] = dict(compiled_table)
+    _METHODS.clear()
+    _METHODS.update(compiled['methods'])
+    _IGNORED_HEADERS.clear()
+    _IGNORED_HEADERS.update(IGNORED_HEADERS)
+
 def to2dx2(some_id, prefix=False):
     return to2dx(some_id, prefix, True)
 
@@ -13,6 +72,18 @@ def to2dx3(some_id, prefix=False):
 
 def to2dx(some_id, prefix=False, use_v2=False):
     """Returns correspondence name if possible."""
+    key = use_v2, bool(prefix)
+    table = _TRANSLATIONS[key]
+    ans = table.get(some_id)
+    if ans is None:
+        ans = translate(some_id, prefix, use_v2)
+        if len(table) >= len(_COMPILED[key]) + MEMO_SIZE:
+            table = _TRANSLATIONS[key] = dict(_COMPILED[key])
+        table[some_id] = ans
+    return ans
+
+def translate(some_id, prefix=False, use_v2=False):
+    """Translates name using the tables directly."""
     ans = OBJC_TO_CPP.get(some_id, some_id)
     starts_with_cc = ans[0:2].upper() == 'CC'
     if use_v2:
@@ -23,7 +94,7 @@ def to2dx(some_id, prefix=False, use_v2=False):
         if prefix and starts_with_cc:
             ans = 'cocos2d::' + ans
     return ans
-    
+
 def getV3Name(some_id):
     """Returns Cocos2d-x-v-3.* name."""
     if some_id in DEPRECATED_V3:
@@ -34,26 +105,39 @@ def getV3Name(some_id):
         return some_id[2:]
     else:
         return some_id
-    
-
-def method2dx(method_name, last_word):
-    """Returns correspondence method with prefix."""
-    if method_name in CREATE_METHODS:
-        return '::create('
-    elif method_name in STATIC_METHODS:
-        return '::' + STATIC_METHODS[method_name] + '('
-    else:
-        return ('::' if last_word[0].isupper() and \
-                last_word != last_word.upper() else '->') + method_name + '('
+
+def method2dx(method_name, last_word, class_names=None):
+    """Returns correspondence method with prefix.
+
+    A receiver from class_names (the project class index) is a class,
+    others are guessed by their case.
+    """
+    ans = _METHODS.get(method_name)
+    if ans is not None:
+        return ans
+    if class_names and last_word in class_names:
+        return '::' + method_name + '('
+    return ('::' if last_word[0].isupper() and \
+            last_word != last_word.upper() else '->') + method_name + '('
 
 def ignored_header(header_name):
     """Checks if file is unused in C++/Cocos2d-x."""
-    return header_name in IGNORED_HEADERS
+    return header_name in _IGNORED_HEADERS
+
+def _format_repl(match_obj):
+    """%@ -> %s match object function."""
+    count = len(match_obj.group(1))
+    return count * r'%' + 's' if count % 2 else match_obj.group(0)
 
 def update_format(str_value):
     """%@ -> %s"""
-    def repl(match_obj):
-        """%@ -> %s match object function."""
-        count = len(match_obj.group(1))
-        return count * r'%' + 's' if count % 2 else match_obj.group(0)
-    return re.sub(r'(?<!%)(%+)@', repl, str_value)
+    if '%@' not in str_value:
+        return str_value
+    return _FORMAT_RE.sub(_format_repl, str_value)
+
+def tables_digest():
+    """Returns hash of the conversion tables."""
+    tables = [globals()[name] for name in TABLE_NAMES]
+    return hashlib.sha1(json.dumps(tables, sort_keys=True)).hexdigest()
+
+compile_tables()
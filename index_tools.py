@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Project-wide index of class names declared in headers.
+
+Headers are scanned by regular expressions only, without the lexer. The
+index is cached in the target folder and only changed headers are
+scanned again.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import file_tools
+
+INDEX_NAME = '.c2dx_classes.json'
+INDEX_VERSION = 2
+
+# headers sent to a worker at once
+CHUNK_SIZE = 64
+
+# Obj-C classes, protocols and forward declarations like @class A, B; and
+# C++ classes of already converted headers (class A , B ; for the latter)
+_DECLARATION_RE = re.compile(
+    r'^[ \t]*(?:@interface|@protocol|@class|class)[ \t]+([\w \t,]+)', re.M)
+
+# comments, strings and characters are matched together, so comment
+# marks in strings are left as they are
+_COMMENT_RE = re.compile(
+    r'/\*.*?\*/|//[^\n]*|("(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\')', re.S)
+
+def get_index_name(file_or_folder):
+    """Returns index file name for the target file or folder."""
+    folder = file_or_folder if os.path.isdir(file_or_folder) \
+        else os.path.dirname(file_or_folder)
+    return os.path.join(folder, INDEX_NAME)
+
+def strip_comments(code):
+    """Returns code with comments replaced by spaces."""
+    return _COMMENT_RE.sub(lambda match: match.group(1) or ' ', code)
+
+def scan_classes(code):
+    """Returns sorted class names declared in code out of comments."""
+    names = set()
+    for names_list in _DECLARATION_RE.findall(strip_comments(code)):
+        for name in names_list.split(','):
+            # the rest is like 'Foo : Base' or 'Foo (Category)'
+            words = name.split()
+            if words and not words[0][0].isdigit():
+                names.add(words[0])
+    return sorted(names)
+
+def scan_header(file_name):
+    """Returns (file name, index record) of header."""
+    with open(file_name, 'rb') as in_file:
+        stat = os.fstat(in_file.fileno())
+        code = in_file.read()
+    return file_name, {'size': stat.st_size, 'mtime': stat.st_mtime,
+                       'sha1': hashlib.sha1(code).hexdigest(),
+                       'classes': scan_classes(code)}
+
+class FileIndex(object):
+    """Records of the target folder files made by scan function with
+    their fingerprints."""
+    version = INDEX_VERSION
+    scan = staticmethod(scan_header)
+
+    def __init__(self, file_name):
+        """Loads cached index if it exists."""
+        self._file_name = file_name
+        self._root = os.path.dirname(os.path.abspath(file_name))
+        # found files start with the folder as it was given
+        self._prefix = os.path.join(os.path.dirname(file_name), '')
+        self._files = {}
+        self._dirty = False
+        if os.path.isfile(file_name):
+            with open(file_name) as in_file:
+                content = json.load(in_file)
+            if content.get('version') == self.version:
+                self._files = content['files']
+
+    def _key(self, file_name):
+        """Returns index key of file."""
+        if file_name.startswith(self._prefix) and self._prefix != os.sep:
+            return file_name[len(self._prefix):]
+        return os.path.relpath(os.path.abspath(file_name), self._root)
+
+    def _is_cached(self, key, file_name):
+        """Checks by size and modification time if record is up to date,
+        a touched file is recognized by its hash if the record has it."""
+        record = self._files.get(key)
+        if record is None:
+            return False
+        try:
+            stat = os.stat(file_name)
+            if record['size'] != stat.st_size:
+                return False
+            if record['mtime'] == stat.st_mtime:
+                return True
+            if 'sha1' not in record:
+                return False
+            with open(file_name, 'rb') as in_file:
+                if hashlib.sha1(in_file.read()).hexdigest() != \
+                        record['sha1']:
+                    return False
+        except (IOError, OSError):
+            return False
+        record['mtime'] = stat.st_mtime  # touched only, stat is enough later
+        self._dirty = True
+        return True
+
+    def update(self, header_list, jobs=1):
+        """Scans new and changed headers, forgets missing ones."""
+        keys = dict((self._key(fname), fname) for fname in header_list)
+        for key in set(self._files) - set(keys):
+            del self._files[key]
+            self._dirty = True
+        changed = dict((fname, key) for key, fname in keys.items()
+                       if not self._is_cached(key, fname))
+        if not changed:
+            return self
+        if jobs > 1 and len(changed) > CHUNK_SIZE:
+            pool = multiprocessing.Pool(jobs)
+            try:
+                records = pool.map(self.scan, changed, CHUNK_SIZE)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            records = [self.scan(fname) for fname in changed]
+        for fname, record in records:
+            self._files[changed[fname]] = record
+        self._dirty = True
+        return self
+
+    def save(self):
+        """Writes index if it was changed."""
+        if self._dirty:
+            # compact and unsorted form is written by the fast encoder
+            file_tools.write_file(self._file_name, json.dumps(
+                {'version': self.version, 'files': self._files},
+                separators=(',', ':')))
+            self._dirty = False
+
+class ClassIndex(FileIndex):
+    """Class names of the target folder headers with their fingerprints."""
+    def class_names(self):
+        """Returns all indexed class names."""
+        names = set()
+        for record in self._files.values():
+            names.update(record['classes'])
+        return frozenset(names)
+
+def load_class_names(file_or_folder, with_subfolders, exclude=(), jobs=1):
+    """Updates cached index of headers of the target, returns its names."""
+    index = ClassIndex(get_index_name(file_or_folder))
+    index.update(file_tools.iter_files(file_or_folder, with_subfolders,
+                                       exclude=exclude,
+                                       accept=file_tools.is_header),
+                 jobs)
+    index.save()
+    return index.class_names()
+
+def names_digest(class_names):
+    """Returns hash of class names, for the incremental manifest."""
+    return hashlib.sha1('\n'.join(sorted(class_names))).hexdigest()
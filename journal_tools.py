@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Journal of backups and outputs made by conversion runs.
+
+Rollback and backup removal replay it instead of searching the whole
+tree for backups.
+"""
+
+import json
+import os
+from multiprocessing.pool import ThreadPool
+from shutil import copy2
+import file_tools
+
+JOURNAL_NAME = '.c2dx_journal.jsonl'
+
+def get_journal_name(file_or_folder):
+    """Returns journal file name for the target file or folder."""
+    folder = file_or_folder if os.path.isdir(file_or_folder) \
+        else os.path.dirname(file_or_folder)
+    return os.path.join(folder, JOURNAL_NAME)
+
+class Journal(object):
+    """Journal of the target folder, a JSON line per converted file."""
+    def __init__(self, file_name):
+        """Journal creation, nothing is read or written yet."""
+        self._file_name = file_name
+        self._root = os.path.dirname(os.path.abspath(file_name))
+        self._out = None
+
+    def _key(self, file_name):
+        """Returns journal path of file."""
+        return os.path.relpath(os.path.abspath(file_name), self._root)
+
+    def exists(self):
+        """Checks if journal file exists."""
+        return os.path.isfile(self._file_name)
+
+    def record(self, result):
+        """Appends converted file with its backup and output."""
+        if self._out is None:
+            self._out = open(self._file_name, 'a')
+        backup = result.get('backup')
+        self._out.write(json.dumps({
+            'source': self._key(result['file']),
+            'backup': backup and self._key(backup),
+            'output': self._key(result['output'])}, sort_keys=True) + '\n')
+        self._out.flush()
+
+    def close(self):
+        """Closes journal after recording."""
+        if self._out is not None:
+            self._out.close()
+            self._out = None
+
+    def entries(self):
+        """Returns entries of all runs, the last one of every source."""
+        entries = {}
+        with open(self._file_name) as in_file:
+            for line in in_file:
+                # a line cut by interrupted run is skipped
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                entries[entry['source']] = entry
+        return [entries[source] for source in sorted(entries)]
+
+    def replay(self, function, with_subfolders, exclude=(), jobs=1):
+        """Calls function(backup, source) for existing backups of the
+        journal in jobs threads, returns entries which were not chosen."""
+        chosen, rest = [], []
+        for entry in self.entries():
+            source = entry['source']
+            if entry['backup'] is None or \
+                    (not with_subfolders and os.path.dirname(source)) or \
+                    file_tools.matches(os.path.basename(source),
+                                       source.replace(os.sep, '/'), exclude):
+                rest.append(entry)
+            else:
+                chosen.append(entry)
+        pairs = [(os.path.join(self._root, entry['backup']),
+                  os.path.join(self._root, entry['source']))
+                 for entry in chosen]
+        def call(pair):
+            """Calls function if backup is still there."""
+            if os.path.isfile(pair[0]):
+                function(*pair)
+        if jobs == 1:
+            for pair in pairs:
+                call(pair)
+        else:
+            pool = ThreadPool(jobs)
+            try:
+                pool.map(call, pairs)
+            finally:
+                pool.close()
+                pool.join()
+        return rest
+
+    def rewrite(self, entries):
+        """Replaces journal by entries, removes it if there are none."""
+        if entries:
+            file_tools.write_file(self._file_name, ''.join(
+                json.dumps(entry, sort_keys=True) + '\n'
+                for entry in entries))
+        elif self.exists():
+            os.remove(self._file_name)
+
+def rollback(journal, with_subfolders, exclude=(), jobs=1):
+    """Restores sources of the journal from their backups."""
+    journal.replay(copy2, with_subfolders, exclude, jobs)
+
+def remove_backup(journal, with_subfolders, exclude=(), jobs=1):
+    """Removes backups of the journal and forgets them."""
+    rest = journal.replay(lambda backup, _: os.remove(backup),
+                          with_subfolders, exclude, jobs)
+    journal.rewrite(rest)
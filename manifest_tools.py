@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Manifest of converted files for incremental conversion."""
+
+import hashlib
+import json
+import os
+import file_tools
+import help2dx
+import index_tools
+import to2dx
+
+MANIFEST_NAME = '.c2dx_manifest.json'
+MANIFEST_VERSION = 1
+
+def get_manifest_name(file_or_folder):
+    """Returns manifest file name for the target file or folder."""
+    folder = file_or_folder if os.path.isdir(file_or_folder) \
+        else os.path.dirname(file_or_folder)
+    return os.path.join(folder, MANIFEST_NAME)
+
+def file_digest(file_name):
+    """Returns hash of file content."""
+    digest = hashlib.sha1()
+    with open(file_name, 'rb') as in_file:
+        for block in iter(lambda: in_file.read(1 << 16), ''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def fingerprint(file_name):
+    """Returns size, modification time and content hash of file."""
+    stat = os.stat(file_name)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime,
+            'sha1': file_digest(file_name)}
+
+class Manifest(object):
+    """Sources converted in the target folder with their outputs."""
+    def __init__(self, file_name, v2_flag, class_names=None,
+                 fast_path=False, formatted=False):
+        """Loads manifest if it exists."""
+        self._file_name = file_name
+        self._root = os.path.dirname(os.path.abspath(file_name))
+        # everything which changes the output besides the source itself
+        self._inputs = {'second': bool(v2_flag),
+                        'tables': help2dx.tables_digest(),
+                        'lexer': to2dx.lextab_name()}
+        if class_names is not None:
+            self._inputs['classes'] = index_tools.names_digest(class_names)
+        if fast_path:
+            self._inputs['fast_path'] = True
+        if formatted:
+            self._inputs['format'] = True
+        self._files = {}
+        self._dirty = False
+        if os.path.isfile(file_name):
+            with open(file_name) as in_file:
+                content = json.load(in_file)
+            if content.get('version') == MANIFEST_VERSION:
+                self._files = content['files']
+
+    def _key(self, file_name):
+        """Returns manifest key of file."""
+        return os.path.relpath(os.path.abspath(file_name), self._root)
+
+    def _matches(self, known, file_name, stat):
+        """Checks if file is the one with known fingerprint."""
+        if known['size'] != stat.st_size:
+            return False
+        if known['mtime'] == stat.st_mtime:
+            return True
+        if known['sha1'] != file_digest(file_name):
+            return False
+        known['mtime'] = stat.st_mtime  # touched only, stat is enough later
+        self._dirty = True
+        return True
+
+    def is_unchanged(self, file_name):
+        """Checks if file was converted before with the same inputs.
+
+        It is either an unchanged source or a header written by the
+        previous run in place of its source.
+        """
+        record = self._files.get(self._key(file_name))
+        if record is None or record['inputs'] != self._inputs:
+            return False
+        output = record['output']
+        out_name = os.path.join(self._root, output['name'])
+        if not os.path.exists(out_name):
+            return False
+        stat = os.stat(file_name)
+        if out_name == os.path.abspath(file_name):
+            # a header like its source is the one restored by rollback
+            return self._matches(output, file_name, stat)
+        return self._matches(record['source'], file_name, stat)
+
+    def record(self, file_name, source, out_name):
+        """Stores fingerprints of the converted source and its output."""
+        output = fingerprint(out_name)
+        output['name'] = self._key(out_name)
+        self._files[self._key(file_name)] = {
+            'inputs': self._inputs, 'source': source, 'output': output}
+        self._dirty = True
+
+    def save(self):
+        """Writes manifest if it was changed."""
+        if self._dirty:
+            file_tools.write_file(self._file_name, json.dumps(
+                {'version': MANIFEST_VERSION, 'files': self._files},
+                indent=1, sort_keys=True))
+            self._dirty = False
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Run-level metrics: per-file latency, sizes and conversion counts."""
+
+import json
+import math
+import time
+from timeit import default_timer
+import file_tools
+
+# counts of every file, they are summed for the run
+COUNTERS = ('bytes_in', 'bytes_out', 'tokens', 'objc_calls', 'translated')
+
+# latency percentiles of the report
+PERCENTILES = (50, 95, 99)
+
+def file_metrics(cocos_lexer, bytes_in, bytes_out, seconds,
+                 fast_path=False):
+    """Returns metrics of the file converted by the lexer (or
+    StreamConverter), before it is refreshed. Files of the fast path are
+    copied without the lexer."""
+    return {'seconds': seconds, 'bytes_in': bytes_in, 'bytes_out': bytes_out,
+            'tokens': cocos_lexer.token_count,
+            'objc_calls': cocos_lexer.objc_calls,
+            'translated': cocos_lexer.translated, 'fast_path': fast_path}
+
+def percentile(values, percent):
+    """Returns nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    rank = int(math.ceil(percent * len(values) / 100.0))
+    return values[max(rank, 1) - 1]
+
+def fast_path_totals(files):
+    """Returns count of files of the fast path and seconds it saved,
+    estimated by the time per byte of the lexed files (None if no file
+    was lexed)."""
+    fast = [record for record in files if record.get('fast_path')]
+    lexed = [record for record in files if not record.get('fast_path')]
+    lexed_bytes = sum(record['bytes_in'] for record in lexed)
+    saved = None if fast else 0.0
+    if fast and lexed_bytes:
+        rate = sum(record['seconds'] for record in lexed) / lexed_bytes
+        saved = max(sum(record['bytes_in'] * rate - record['seconds']
+                        for record in fast), 0.0)
+    return {'files': len(fast), 'seconds_saved': saved}
+
+class RunMetrics(object):
+    """Metrics of converted files and totals of the whole run."""
+    def __init__(self):
+        """Empty metrics creation, the run starts now."""
+        self.files = []
+        self._start = default_timer()
+        self._started = time.time()
+
+    def add(self, result):
+        """Adds metrics of converted file (result of process_file)."""
+        record = dict(result['metrics'])
+        record['file'] = result['file']
+        self.files.append(record)
+
+    def totals(self):
+        """Returns totals, throughput and latency percentiles of the run."""
+        seconds = default_timer() - self._start
+        totals = {'files': len(self.files), 'seconds': seconds}
+        for name in COUNTERS:
+            totals[name] = sum(record[name] for record in self.files)
+        rate = 1.0 / seconds if seconds > 0 else 0.0
+        totals['throughput'] = {
+            'files_per_second': totals['files'] * rate,
+            'bytes_per_second': totals['bytes_in'] * rate,
+            'tokens_per_second': totals['tokens'] * rate}
+        latency = sorted(record['seconds'] for record in self.files)
+        totals['latency'] = dict(('p%d' % percent,
+                                  percentile(latency, percent))
+                                 for percent in PERCENTILES)
+        totals['latency']['max'] = latency[-1] if latency else 0.0
+        totals['latency']['mean'] = \
+            sum(latency) / len(latency) if latency else 0.0
+        totals['fast_path'] = fast_path_totals(self.files)
+        return totals
+
+    def report(self):
+        """Returns one line summary of the run."""
+        totals = self.totals()
+        return '%d file(s), %.2f s, %.2f MB/s, latency p50 %.1f ms, ' \
+            'p95 %.1f ms, p99 %.1f ms' % (
+                totals['files'], totals['seconds'],
+                totals['throughput']['bytes_per_second'] / (1 << 20),
+                totals['latency']['p50'] * 1000,
+                totals['latency']['p95'] * 1000,
+                totals['latency']['p99'] * 1000)
+
+    def fast_path_report(self):
+        """Returns one line summary of the fast path."""
+        fast_path = fast_path_totals(self.files)
+        saved = 'time saved unknown, no file was lexed' \
+            if fast_path['seconds_saved'] is None \
+            else 'about %.2f s saved' % fast_path['seconds_saved']
+        return '%d of %d file(s) copied by the fast path, %s' % (
+            fast_path['files'], len(self.files), saved)
+
+    def save(self, file_name):
+        """Writes metrics as JSON."""
+        data = {'started': time.strftime('%Y-%m-%dT%H:%M:%S',
+                                         time.localtime(self._started)),
+                'totals': self.totals(), 'files': self.files}
+        file_tools.write_file(file_name, json.dumps(data, indent=2,
+                                                    sort_keys=True) + '\n')
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Mapping packs: JSON files extending the conversion tables of data2dx.
+
+A pack is an object of some tables named as in data2dx:
+
+    {"OBJC_TO_CPP": {"UIView": "CCNode", "UIColor": "ccColor4F"},
+     "STATIC_METHODS": {"sharedManager": "getInstance"},
+     "IGNORED_HEADERS": ["GameKit/GameKit.h"]}
+
+Mappings of later packs win over the earlier ones and the built-in
+tables, lists are extended. The merged tables are compiled into the
+lookups of help2dx, so the lexer still converts in one pass whatever
+count of packs is loaded. Compiled tables are cached by the hash of the
+packs and reloaded without parsing them again.
+"""
+
+import cPickle
+import hashlib
+import json
+import os
+import file_tools
+import help2dx
+
+PACK_VERSION = 1
+
+# cached compiled tables, by digest of the packs
+CACHE_FORMAT = 'c2dx_pack_%s.pickle'
+
+# tables mapping names to names, the others are lists of names
+MAPPINGS = frozenset(['OBJC_TO_CPP', 'V2_TO_V3', 'STATIC_METHODS'])
+
+# built-in tables, packs always extend them
+_BASE_TABLES = help2dx.get_tables()
+_BASE_DIGEST = help2dx.tables_digest()
+
+# digest of the installed packs, None for the built-in tables
+_installed = None
+
+def _to_str(value):
+    """Returns UTF-8 string of JSON string."""
+    return value.encode('utf-8') if isinstance(value, unicode) else value
+
+def _is_names(values):
+    """Checks if all values are strings."""
+    return all(isinstance(value, basestring) for value in values)
+
+def read_pack(file_name):
+    """Returns tables of pack file, ValueError is raised for a wrong one."""
+    with open(file_name) as in_file:
+        try:
+            content = json.load(in_file)
+        except ValueError as exc:
+            raise ValueError('%s: %s' % (file_name, exc))
+    if not isinstance(content, dict):
+        raise ValueError('%s: pack must be an object of tables' % file_name)
+    tables = {}
+    for name, table in content.items():
+        name = _to_str(name)
+        if name not in help2dx.TABLE_NAMES:
+            raise ValueError('%s: unknown table %r, use some of: %s' % (
+                file_name, name, ', '.join(help2dx.TABLE_NAMES)))
+        if name in MAPPINGS:
+            if not isinstance(table, dict) or not _is_names(table.values()):
+                raise ValueError('%s: %s must map names to names' % (
+                    file_name, name))
+            tables[name] = dict((_to_str(key), _to_str(value))
+                                for key, value in table.items())
+        else:
+            if not isinstance(table, list) or not _is_names(table):
+                raise ValueError('%s: %s must be a list of names' % (
+                    file_name, name))
+            tables[name] = [_to_str(value) for value in table]
+    return tables
+
+def merge_tables(base, packs):
+    """Returns base tables extended by tables of packs in their order."""
+    merged = {}
+    for name in help2dx.TABLE_NAMES:
+        if name in MAPPINGS:
+            table = dict(base[name])
+            for pack in packs:
+                table.update(pack.get(name, {}))
+        else:
+            table = list(base[name])
+            seen = set(table)
+            for pack in packs:
+                for value in pack.get(name, ()):
+                    if value not in seen:
+                        seen.add(value)
+                        table.append(value)
+            table = tuple(table)
+        merged[name] = table
+    return merged
+
+def packs_digest(file_names):
+    """Returns hash of the built-in tables and content of pack files."""
+    digest = hashlib.sha1('%d %s\n' % (PACK_VERSION, _BASE_DIGEST))
+    for file_name in file_names:
+        with open(file_name, 'rb') as in_file:
+            data = in_file.read()
+        digest.update('%d\n' % len(data))
+        digest.update(data)
+    return digest.hexdigest()
+
+def _load_cache(cache_name):
+    """Returns (tables, compiled lookups) of cache file or None."""
+    if not os.path.isfile(cache_name):
+        return None
+    try:
+        with open(cache_name, 'rb') as in_file:
+            return cPickle.load(in_file)
+    except Exception:  # pylint: disable=broad-except
+        return None  # broken cache, compile the packs again
+
+def _save_cache(cache_name, tables):
+    """Stores tables with their compiled lookups."""
+    try:
+        cache_dir = os.path.dirname(cache_name)
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        file_tools.write_file(cache_name, cPickle.dumps(
+            (tables, help2dx.compiled_tables()), cPickle.HIGHEST_PROTOCOL),
+                              binary=True)
+    except (IOError, OSError):
+        pass  # read-only location, work without cache
+
+def load_packs(file_names, cache_dir=None):
+    """Installs the built-in tables extended by pack files, returns
+    digest of the packs (None if there are none).
+
+    With cache_dir the compiled tables are stored there and reloaded
+    while the packs and the built-in tables are the same.
+    """
+    # pylint: disable=global-statement
+    global _installed
+    file_names = list(file_names or ())
+    digest = packs_digest(file_names) if file_names else None
+    if digest == _installed:
+        return digest
+    if digest is None:
+        help2dx.set_tables(_BASE_TABLES)
+        _installed = None
+        return None
+    cache_name = os.path.join(cache_dir, CACHE_FORMAT % digest) \
+        if cache_dir is not None else None
+    cached = _load_cache(cache_name) if cache_name is not None else None
+    if cached is not None:
+        help2dx.set_tables(*cached)
+    else:
+        tables = merge_tables(_BASE_TABLES, [read_pack(file_name)
+                                             for file_name in file_names])
+        help2dx.set_tables(tables)
+        if cache_name is not None:
+            _save_cache(cache_name, tables)
+    _installed = digest
+    return digest
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Pipelined processing: stages in threads connected by bounded queues."""
+
+import Queue
+import sys
+import threading
+from timeit import default_timer
+
+# items waiting between two stages
+QUEUE_SIZE = 16
+
+# seconds between checks of the stop flag while waiting on a queue
+POLL_TIME = 0.1
+
+# end of items marker
+_DONE = object()
+
+class Stage(threading.Thread):
+    """Stage thread applying function to items of inbox."""
+    def __init__(self, name, function, inbox, outbox, stop):
+        """Stage creation."""
+        super(Stage, self).__init__(name=name)
+        self.daemon = True
+        self.function = function
+        self.inbox = inbox
+        self.outbox = outbox
+        self.stop = stop
+        # processed items count
+        self.items = 0
+        # seconds in function, waiting for input and for room in output
+        self.busy = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+        # sys.exc_info() of the failure
+        self.error = None
+
+    def _get(self):
+        """Returns next input item, _DONE when stopped."""
+        start = default_timer()
+        try:
+            while not self.stop.is_set():
+                try:
+                    return self.inbox.get(timeout=POLL_TIME)
+                except Queue.Empty:
+                    pass
+            return _DONE
+        finally:
+            self.starved += default_timer() - start
+
+    def _put(self, item):
+        """Puts item to output unless stopped."""
+        start = default_timer()
+        try:
+            while not self.stop.is_set():
+                try:
+                    self.outbox.put(item, timeout=POLL_TIME)
+                    return
+                except Queue.Full:
+                    pass
+        finally:
+            self.blocked += default_timer() - start
+
+    def run(self):
+        """Processes items until the end marker."""
+        try:
+            while True:
+                item = self._get()
+                if item is _DONE:
+                    break
+                start = default_timer()
+                item = self.function(item)
+                self.busy += default_timer() - start
+                self.items += 1
+                self._put(item)
+        except Exception:  # pylint: disable=broad-except
+            self.error = sys.exc_info()
+            self.stop.set()
+        finally:
+            self._put(_DONE)
+
+class Feeder(Stage):
+    """First stage taking items from iterable, which may be slow too."""
+    def __init__(self, items, outbox, stop):
+        """Feeder creation."""
+        super(Feeder, self).__init__('feed', lambda item: item, None, outbox,
+                                     stop)
+        self.source = iter(items)
+
+    def _get(self):
+        """Returns next item of iterable, _DONE at the end."""
+        if self.stop.is_set():
+            return _DONE
+        start = default_timer()
+        try:
+            return next(self.source, _DONE)
+        finally:
+            self.busy += default_timer() - start
+
+class Pipeline(object):
+    """Chain of stages, every one works in its own thread."""
+    def __init__(self, queue_size=QUEUE_SIZE):
+        """Empty pipeline creation."""
+        self.queue_size = queue_size
+        self.functions = []
+        self.stages = []
+        self.wall = 0.0
+
+    def add(self, name, function):
+        """Appends stage which returns function(item) for every item."""
+        self.functions.append((name, function))
+        return self
+
+    def run(self, items):
+        """Yields items passed through all stages in the input order."""
+        stop = threading.Event()
+        inbox = Queue.Queue(self.queue_size)
+        self.stages = [Feeder(items, inbox, stop)]
+        for name, function in self.functions:
+            outbox = Queue.Queue(self.queue_size)
+            self.stages.append(Stage(name, function, inbox, outbox, stop))
+            inbox = outbox
+        start = default_timer()
+        for stage in self.stages:
+            stage.start()
+        try:
+            while True:
+                try:
+                    item = inbox.get(timeout=POLL_TIME)
+                except Queue.Empty:
+                    if stop.is_set():
+                        break  # a stage failed
+                    continue
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            stop.set()
+            for stage in self.stages:
+                stage.join()
+            self.wall = default_timer() - start
+        for stage in self.stages:
+            if stage.error is not None:
+                raise stage.error[0], stage.error[1], stage.error[2]
+
+    def report(self):
+        """Returns utilization of stages, the busiest one is the bottleneck."""
+        wall = self.wall or 1.0
+        lines = ['Pipeline: %.2f ms' % (self.wall * 1000),
+                 '  %-10s %7s %10s %6s %9s %9s' % (
+                     'stage', 'items', 'busy ms', 'busy', 'starved',
+                     'blocked')]
+        for stage in self.stages:
+            lines.append('  %-10s %7d %10.2f %5.1f%% %8.1f%% %8.1f%%' % (
+                stage.name, stage.items, stage.busy * 1000,
+                stage.busy * 100 / wall, stage.starved * 100 / wall,
+                stage.blocked * 100 / wall))
+        return '\n'.join(lines)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Pre-scan telling plain C/C++ code from code the lexer has to convert.
+
+Many headers are plain C/C++ (math utilities, third party code, constants)
+and the lexer gives them only '#pragma once' and spaces. A few regular
+expression scans find everything the CocosLexer rules would change:
+
+    @ and #import       Obj-C constructs and imports
+    [                   Obj-C calls, only indexing after a name or ] is safe
+    - or + after ; or } method declarations
+    identifiers         names changed by the conversion tables
+
+Sources full of Obj-C are rejected at once by their usual constructs.
+Tokens which are never converted (comments, strings without %@ formats,
+characters, preprocessor lines and cocos2d:: names) are left out first. The scans
+are conservative: trivial code never needs the lexer, some other code
+may not need it either. Trivial code is copied, headers get '#pragma
+once' unless they have it.
+"""
+
+import re
+
+# constructs of Obj-C sources, found without leaving comments out
+_OBJC_RE = re.compile(
+    r'@(?:interface|implementation|protocol|end\b|"|selector)|\#import'
+    r'|\[\s*(?:self|super)\b')
+
+# tokens which are never converted, #define and '#pragma once' are
+# single tokens only up to their names, the lexer goes on after them
+_SKIPPED_RE = re.compile(
+    r'/\*[^*]*\*+(?:[^*/][^*]*\*+)*/|//.*'
+    r'|(?P<str>"(?:[^"\\\n]|\\[\n"]|\\(?![\n"]))*\\?")'
+    r"|'(?:[^\\]|\\.)'"
+    r'|\#define\s+|(?P<pragma>\#pragma\s+once)'
+    r'|\#(?!import)(?:[^\\\n]|\\\n?)*'
+    r'|(?<!\w)cocos2d\s*::\s*[a-zA-Z_]\w*')
+
+# brackets of indexing (the lexer keeps them when they follow a name or ])
+_INDEX_RE = re.compile(
+    r'(?:(?<!\w)(?!(?:do|else|in|return)\b)[a-zA-Z_]\w*|\])\s*\[')
+
+# sign starting a method declaration: after ; or }, numbers, casts and
+# 'name :' parts do not change the last symbol of the lexer, not a part
+# of number or operator
+_METHOD_DECL_RE = re.compile(
+    r'(?:\A|[;}])(?:\s|[-+]?\d+(?:\.\d*(?:[eE][-+]?\d+)?)?[fFlL]?(?!\d)'
+    r'|\(\s*[a-zA-Z_]\w*[\s*]*\)|[a-zA-Z_]\w*\s*:(?!:))*'
+    r'[-+](?![-+&|><:=\d])')
+
+_ID_RE = re.compile(r'[a-zA-Z_]\w*')
+
+def _skip(match):
+    """Returns replacement of skipped token, strings are kept as the last
+    symbol of the lexer, strings with %@ formats (the lexer converts them)
+    are kept as '@', so the code is not trivial."""
+    string = match.group('str')
+    if string is None:
+        return ' '
+    return ' @ ' if '%@' in string else ' " '
+
+def significant_code(code):
+    """Returns code without tokens which are never converted, they are
+    replaced by spaces (strings by a quote, or by '@' if they have %@)."""
+    return _SKIPPED_RE.sub(_skip, code)
+
+def is_trivial(code, is_header, to2dx_func):
+    """Checks if code has nothing to convert by the lexer using
+    identifier conversion to2dx_func (of CocosLexer)."""
+    if _OBJC_RE.search(code):
+        return False
+    code = significant_code(code)
+    if '@' in code or '#import' in code:
+        return False
+    if code.count('[') != len(_INDEX_RE.findall(code)):
+        return False
+    if _METHOD_DECL_RE.search(code):
+        return False
+    for name in set(_ID_RE.findall(code)):
+        if to2dx_func(name, is_header) != name:
+            return False
+    return True
+
+def has_pragma_once(code):
+    """Checks if code has '#pragma once' out of comments and strings."""
+    return any(match.group('pragma') for match in _SKIPPED_RE.finditer(code))
+
+def copy_code(code, is_header):
+    """Returns output of trivial code."""
+    if is_header and not has_pragma_once(code):
+        return '#pragma once\n' + code
+    return code
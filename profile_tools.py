@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Per-rule profiling of CocosLexer token handlers."""
+
+from timeit import default_timer
+
+# name of scanning time (PLY regular expressions and token loop)
+SCAN = '(scan)'
+
+class RuleProfile(object):
+    """Call counts and cumulative time of lexer rules."""
+    def __init__(self):
+        """Empty profile creation."""
+        self.calls = {}
+        self.times = {}
+        self.total = 0.0
+        self.files = 0
+
+    def attach(self, cocos_lexer):
+        """Wraps rules of the built lexer to be timed into this profile."""
+        calls, times = self.calls, self.times
+        def wrapper(name, func):
+            """Returns timed handler."""
+            calls[name] = 0
+            times[name] = 0.0
+            def timed(tok):
+                """Calls handler and stores its time."""
+                start = default_timer()
+                try:
+                    return func(tok)
+                finally:
+                    times[name] += default_timer() - start
+                    calls[name] += 1
+            timed.__name__ = func.__name__
+            return timed
+        cocos_lexer.wrap_rules(wrapper)
+        return self
+
+    def reset(self):
+        """Clears collected data."""
+        for name in self.calls:
+            self.calls[name] = 0
+            self.times[name] = 0.0
+        self.total = 0.0
+        self.files = 0
+
+    def add_total(self, seconds):
+        """Adds time of the whole token loop for one file."""
+        self.total += seconds
+        self.files += 1
+
+    def snapshot(self):
+        """Returns collected data as a plain dictionary."""
+        return {'calls': dict(self.calls), 'times': dict(self.times),
+                'total': self.total, 'files': self.files}
+
+    def merge(self, data):
+        """Adds snapshot of other profile."""
+        for name, count in data['calls'].items():
+            self.calls[name] = self.calls.get(name, 0) + count
+            self.times[name] = self.times.get(name, 0.0) + data['times'][name]
+        self.total += data['total']
+        self.files += data['files']
+
+    def report(self, title):
+        """Returns report sorted by time."""
+        handlers = sum(self.times.values())
+        rows = [(time, self.calls[name], name)
+                for name, time in self.times.items() if self.calls[name]]
+        rows.append((max(self.total - handlers, 0.0), None, SCAN))
+        rows.sort(reverse=True)
+        total = self.total or 1.0
+        lines = ['%s: %d file(s), %.2f ms (handlers %.2f ms)' % (
+            title, self.files, self.total * 1000, handlers * 1000),
+                 '  %-24s %9s %10s %7s' % ('rule', 'calls', 'time ms',
+                                           'share')]
+        for time, calls, name in rows:
+            lines.append('  %-24s %9s %10.2f %6.1f%%' % (
+                name, '' if calls is None else calls, time * 1000,
+                time * 100 / total))
+        return '\n'.join(lines)
@@ -0,0 +1,352 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Fast tokenizer engine for CocosLexer rules.
+
+It takes the same t_* rules, states and token types as PLY does, but
+scans every state with master regular expressions chosen by the first
+character (only rules able to start with it are tried), skips ignored
+characters with one regex call and produces slotted tokens. PLY remains
+the reference engine, this one must give identical output.
+"""
+
+import copy
+import re
+import sre_constants
+import sre_parse
+import types
+
+# sentinel for handlers which are not wrapped
+_UNSET = object()
+
+# characters covered by first character dispatch, others use all rules
+_ALL_CHARS = frozenset(chr(code) for code in range(256))
+
+# parsed class categories : equal regular expression
+_CATEGORIES = {sre_constants.CATEGORY_DIGIT: r'\d',
+               sre_constants.CATEGORY_NOT_DIGIT: r'\D',
+               sre_constants.CATEGORY_SPACE: r'\s',
+               sre_constants.CATEGORY_NOT_SPACE: r'\S',
+               sre_constants.CATEGORY_WORD: r'\w',
+               sre_constants.CATEGORY_NOT_WORD: r'\W'}
+
+class LexError(Exception):
+    """Scanning error."""
+    def __init__(self, message, text):
+        """Error creation."""
+        super(LexError, self).__init__(message)
+        self.text = text
+
+class Token(object):
+    """Lexer token."""
+    __slots__ = ('type', 'value', 'lexer', 'lexpos')
+
+    def __init__(self, tok_type, value, lexer, lexpos):
+        """Token creation."""
+        self.type = tok_type
+        self.value = value
+        self.lexer = lexer
+        self.lexpos = lexpos
+
+    def __repr__(self):
+        """Token representation."""
+        return 'Token(%s,%r,%d)' % (self.type, self.value, self.lexpos)
+
+class Match(object):
+    """Match of a rule inside master regular expression."""
+    __slots__ = ('_match', '_names')
+
+    def __init__(self, match, names):
+        """Match creation."""
+        self._match = match
+        self._names = names
+
+    def group(self, name=0):
+        """Returns group of the rule by its own name."""
+        return self._match.group(self._names.get(name, name))
+
+def rule_regex(func):
+    """Returns regular expression of rule function."""
+    return getattr(func, 'regex', func.__doc__)
+
+def rename_groups(regex, prefix):
+    """Returns regex with plain groups made non-capturing and named ones
+    prefixed, and the map of original group names to new ones."""
+    out, names = [], {}
+    i, length, in_class = 0, len(regex), False
+    while i < length:
+        char = regex[i]
+        if char == '\\':
+            out.append(regex[i:i + 2])
+            i += 2
+            continue
+        if in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+            # ']' right after '[' or '[^' is a literal
+            start = i + 1 + (regex[i + 1:i + 2] == '^')
+            start += regex[start:start + 1] == ']'
+            out.append(regex[i:start])
+            i = start
+            continue
+        elif regex.startswith('(?P<', i):
+            end = regex.index('>', i)
+            name = regex[i + 4:end]
+            names[name] = prefix + name
+            out.append('(?P<%s>' % names[name])
+            i = end + 1
+            continue
+        elif char == '(' and not regex.startswith('(?', i):
+            out.append('(?:')
+            i += 1
+            continue
+        out.append(char)
+        i += 1
+    return ''.join(out), names
+
+def _class_chars(items):
+    """Returns characters of parsed character class."""
+    chars, negate = set(), False
+    for op, value in items:
+        if op == sre_constants.NEGATE:
+            negate = True
+        elif op == sre_constants.LITERAL:
+            chars.add(chr(value))
+        elif op == sre_constants.RANGE:
+            chars.update(chr(code) for code in range(value[0], value[1] + 1)
+                         if code < 256)
+        elif op == sre_constants.CATEGORY and value in _CATEGORIES:
+            category = re.compile(_CATEGORIES[value])
+            chars.update(char for char in _ALL_CHARS if category.match(char))
+        else:
+            return _ALL_CHARS
+    return _ALL_CHARS - chars if negate else chars
+
+def _first_chars(items):
+    """Returns (first characters, can be empty) of parsed regex."""
+    chars = set()
+    for op, value in items:
+        empty = False
+        if op == sre_constants.LITERAL:
+            found = set([chr(value)]) if value < 256 else set()
+        elif op == sre_constants.IN:
+            found = _class_chars(value)
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            found, empty = _first_chars(value[2])
+            empty = empty or value[0] == 0
+        elif op == sre_constants.SUBPATTERN:
+            found, empty = _first_chars(value[-1])
+        elif op == sre_constants.BRANCH:
+            found = set()
+            for branch in value[1]:
+                branch_chars, branch_empty = _first_chars(branch)
+                found |= branch_chars
+                empty = empty or branch_empty
+        elif op in (sre_constants.AT, sre_constants.ASSERT,
+                    sre_constants.ASSERT_NOT):
+            found, empty = set(), True
+        else:
+            # anything else may start with any character
+            found = _ALL_CHARS
+        chars |= found
+        if not empty:
+            return chars, False
+    return chars, True
+
+def first_chars(regex, flags=0):
+    """Returns set of characters a match of regex can start with, or None
+    if the match can be empty."""
+    chars, empty = _first_chars(sre_parse.parse(regex, flags))
+    return None if empty else chars
+
+def rule_state_token(name, state_names):
+    """Returns (states, token type) of rule name like PLY does."""
+    parts = name.split('_')
+    for i, part in enumerate(parts[1:], 1):
+        if part not in state_names and part != 'ANY':
+            break
+    states = tuple(parts[1:i]) if i > 1 else ('INITIAL',)
+    if 'ANY' in states:
+        states = tuple(state_names)
+    return states, '_'.join(parts[i:])
+
+class FastLexer(object):
+    """Lexer driven by the rules of module (CocosLexer instance)."""
+    def __init__(self, module, reflags=re.VERBOSE):
+        """Lexer creation."""
+        self._module = module
+        self._reflags = reflags
+        self._wrappers = {}
+        self.lexdata = ''
+        self.lexpos = 0
+        self.lexmatch = None
+        self.lexstate = 'INITIAL'
+        self._build()
+
+    def _build(self):
+        """Builds master regular expressions of all states."""
+        module = self._module
+        state_names = dict(getattr(module, 'states', ()))
+        state_names['INITIAL'] = 'inclusive'
+        rules = dict((name, []) for name in state_names)
+        ignore, errorf = {}, {}
+        for name in dir(module):
+            if not name.startswith('t_'):
+                continue
+            value = getattr(module, name)
+            states, tok_type = rule_state_token(name, state_names)
+            for state in states:
+                if tok_type == 'ignore':
+                    ignore[state] = value
+                elif tok_type == 'error':
+                    errorf[state] = self._wrap(name, value)
+                elif isinstance(value, types.MethodType):
+                    rules[state].append((value.__code__.co_firstlineno,
+                                         name, tok_type, value))
+        self._states = {}
+        for state, kind in state_names.items():
+            state_rules = sorted(rules[state])
+            if kind == 'inclusive' and state != 'INITIAL':
+                # rules already there would match first anyway
+                own = set(rule[1] for rule in state_rules)
+                state_rules += [rule for rule in sorted(rules['INITIAL'])
+                                if rule[1] not in own]
+            dispatch = self._dispatch(state_rules)
+            state_ignore = ignore.get(state, '')
+            skip = re.compile('[%s]*' % re.escape(state_ignore)).match \
+                if state_ignore else None
+            self._states[state] = (dispatch, state_ignore, skip,
+                                   errorf.get(state))
+        self.begin(self.lexstate)
+
+    def _compile(self, rules):
+        """Returns (match function, index by group number) of rules."""
+        valid_types = set(self._module.tokens)
+        parts, index = [], [None]
+        for number, (_, name, tok_type, func) in enumerate(rules):
+            regex, names = rename_groups(rule_regex(func), '_%d_' % number)
+            parts.append('(?P<%s>%s)' % (name, regex))
+            index.append((self._wrap(name, func), tok_type, names or None,
+                          tok_type in valid_types))
+            # named groups of the rule are numbered after it
+            index.extend([None] * len(names))
+        return re.compile('|'.join(parts), self._reflags).match, index
+
+    def _dispatch(self, rules):
+        """Returns {first character: (match function, index)} of rules.
+
+        Only rules which can start with the character are tried for it,
+        characters missing in the map use all rules."""
+        starts = [first_chars(rule_regex(rule[3]), self._reflags)
+                  for rule in rules]
+        dispatch = {None: self._compile(rules)}
+        compiled = {}
+        for char in _ALL_CHARS:
+            subset = tuple(rule for rule, chars in zip(rules, starts)
+                           if chars is None or char in chars)
+            if not subset:
+                continue
+            key = tuple(rule[1] for rule in subset)
+            if key not in compiled:
+                compiled[key] = self._compile(subset)
+            dispatch[char] = compiled[key]
+        return dispatch
+
+    def _wrap(self, name, func):
+        """Returns handler wrapped by the current wrapper if any."""
+        wrapper = self._wrappers.get(name, _UNSET)
+        return func if wrapper is _UNSET else wrapper
+
+    ##################
+    # PLY interface. #
+    ##################
+    def input(self, data):
+        """Sets new input."""
+        self.lexdata = data
+        self.lexpos = 0
+
+    def begin(self, state):
+        """Changes lexer state."""
+        (self._rules, self._ignore, self._skip,
+         self._errorf) = self._states[state]
+        self.lexstate = state
+
+    def skip(self, count):
+        """Skips count characters."""
+        self.lexpos += count
+
+    def clone(self, module):
+        """Returns lexer sharing regular expressions with handlers bound to
+        other module, like PLY does."""
+        def rebind(func):
+            """Returns handler of the module by name."""
+            return func and getattr(module, func.__name__)
+        lexer = copy.copy(self)
+        lexer._module = module
+        lexer._wrappers = {}
+        lexer._states = {}
+        rebound = {}
+        for state, (dispatch, ignore, skip, errorf) in self._states.items():
+            rules = {}
+            for char, (match, index) in dispatch.items():
+                # characters share compiled rules, rebind them once
+                if id(index) not in rebound:
+                    rebound[id(index)] = match, [
+                        item and (rebind(item[0]),) + item[1:]
+                        for item in index]
+                rules[char] = rebound[id(index)]
+            lexer._states[state] = rules, ignore, skip, rebind(errorf)
+        lexer.begin(self.lexstate)
+        return lexer
+
+    def wrap_rules(self, wrapper):
+        """Replaces rule handlers by wrapper(name, func)."""
+        for name in dir(self._module):
+            value = getattr(self._module, name)
+            if name.startswith('t_') and \
+                    isinstance(value, types.MethodType):
+                self._wrappers[name] = wrapper(name, value)
+        self._build()
+
+    def __iter__(self):
+        """Iterates over tokens."""
+        data = self.lexdata
+        end = len(data)
+        while True:
+            pos = self.lexpos
+            if pos >= end:
+                return
+            if data[pos] in self._ignore:
+                pos = self._skip(data, pos).end()
+                self.lexpos = pos
+                if pos >= end:
+                    return
+            rules = self._rules
+            match, index = rules.get(data[pos]) or rules[None]
+            match = match(data, pos)
+            if match is None:
+                tok = self._error(data, pos)
+            else:
+                func, tok_type, names, valid = index[match.lastindex]
+                self.lexpos = match.end()
+                self.lexmatch = match if names is None \
+                    else Match(match, names)
+                tok = func(Token(tok_type, match.group(), self, pos))
+                if tok and not valid:
+                    raise LexError("Rule '%s' returned an unknown token type "
+                                   "'%s'" % (func.__name__, tok.type),
+                                   data[self.lexpos:])
+            if tok:
+                yield tok
+
+    def _error(self, data, pos):
+        """Calls error rule for illegal character."""
+        if self._errorf is None:
+            raise LexError("Illegal character '%s' at index %d" % (
+                data[pos], pos), data[pos:])
+        tok = self._errorf(Token('error', data[pos:], self, pos))
+        if self.lexpos == pos:
+            raise LexError("Scanning error. Illegal character '%s'" % (
+                data[pos]), data[pos:])
+        return tok
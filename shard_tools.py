@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Deterministic sharding of conversion across machines.
+
+Every node finds the same files in its checkout of the target and
+converts the part K of N given by --shard K/N. Files are balanced by
+size: the largest one goes to the least loaded shard first, files of
+equal size are ordered by hash of their relative path, so the partition
+depends on the tree only. Every node writes a shard manifest of its part
+to the target folder, --merge-shards checks the manifests collected from
+all nodes: every file was converted exactly once.
+"""
+
+import argparse
+import glob
+import hashlib
+import heapq
+import json
+import os
+import file_tools
+
+SHARD_VERSION = 1
+SHARD_FORMAT = '.c2dx_shard_%d_of_%d.json'
+SHARD_GLOB = '.c2dx_shard_*_of_*.json'
+MERGED_NAME = '.c2dx_shards.json'
+
+# bytes added to the size of every file, small files are not free
+FILE_COST = 4096
+
+def parse_shard(text):
+    """Returns (K, N) of 'K/N' option, K counts from 1."""
+    try:
+        index, count = [int(part) for part in text.split('/')]
+    except ValueError:
+        raise argparse.ArgumentTypeError('shard must be K/N, e.g. 1/4')
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError('shard K/N needs 1 <= K <= N')
+    return index, count
+
+def get_root(file_or_folder):
+    """Returns folder of the target file or folder."""
+    return file_or_folder if os.path.isdir(file_or_folder) \
+        else os.path.dirname(file_or_folder)
+
+def rel_name(file_name, root):
+    """Returns name of file relative to root, the same on every system."""
+    return os.path.relpath(os.path.abspath(file_name),
+                           os.path.abspath(root)).replace(os.sep, '/')
+
+def tree_digest(rel_names):
+    """Returns hash of the relative names of all files."""
+    return hashlib.sha1('\n'.join(sorted(rel_names))).hexdigest()
+
+def partition(file_list, root, count):
+    """Returns count lists of files balanced by their sizes."""
+    shards = [[] for _ in xrange(count)]
+    order = sorted((-os.path.getsize(fname),
+                    hashlib.sha1(rel_name(fname, root)).hexdigest(), fname)
+                   for fname in file_list)
+    # (load, shard index) of every shard
+    loads = [(0, index) for index in xrange(count)]
+    for neg_size, _, fname in order:
+        load, index = heapq.heappop(loads)
+        shards[index].append(fname)
+        heapq.heappush(loads, (load - neg_size + FILE_COST, index))
+    return shards
+
+class ShardManifest(object):
+    """Files of one shard and their outputs."""
+    def __init__(self, file_or_folder, index, count, file_list):
+        """Takes part index (from 1) of count ones of all found files."""
+        self._root = get_root(file_or_folder)
+        self.file_name = os.path.join(self._root, SHARD_FORMAT % (index,
+                                                                  count))
+        self.index = index
+        self.count = count
+        file_list = list(file_list)
+        self.tree = tree_digest(rel_name(fname, self._root)
+                                for fname in file_list)
+        self.files = partition(file_list, self._root, count)[index - 1]
+        # [source, output] pairs of converted files
+        self._converted = []
+
+    def record(self, result):
+        """Records converted file (result of process_file)."""
+        self._converted.append([rel_name(result['file'], self._root),
+                                rel_name(result['output'], self._root)])
+
+    def save(self):
+        """Writes manifest."""
+        file_tools.write_file(self.file_name, json.dumps(
+            {'version': SHARD_VERSION, 'shard': self.index,
+             'count': self.count, 'tree': self.tree,
+             'assigned': [rel_name(fname, self._root)
+                          for fname in self.files],
+             'converted': self._converted}, indent=1, sort_keys=True))
+
+def load_shards(folder):
+    """Returns shard manifests found in folder."""
+    shards = []
+    for file_name in sorted(glob.glob(os.path.join(folder, SHARD_GLOB))):
+        with open(file_name) as in_file:
+            shards.append(json.load(in_file))
+    return shards
+
+def merge_shards(folder):
+    """Combines shard manifests of folder into the merged one.
+
+    Returns (count of converted files, problems), the merged manifest is
+    written even if there are problems.
+    """
+    shards = load_shards(folder)
+    if not shards:
+        return 0, ['no shard manifests in %s' % folder]
+    problems = ['shard %s has unknown version' % shard.get('shard')
+                for shard in shards if shard.get('version') != SHARD_VERSION]
+    shards = [shard for shard in shards
+              if shard.get('version') == SHARD_VERSION]
+    counts = set(shard['count'] for shard in shards)
+    trees = set(shard['tree'] for shard in shards)
+    if len(counts) > 1:
+        problems.append('shards of different counts: %s' % ', '.join(
+            str(count) for count in sorted(counts)))
+    if len(trees) > 1:
+        problems.append('shards were made of different file trees')
+    count = max(counts) if counts else 0
+    found = [shard['shard'] for shard in shards]
+    for index in xrange(1, count + 1):
+        if index not in found:
+            problems.append('shard %d/%d is missing' % (index, count))
+        elif found.count(index) > 1:
+            problems.append('shard %d/%d is given %d times' % (
+                index, count, found.count(index)))
+    # file : its shard, file : [(shard, output)] of its conversions
+    assigned = {}
+    converted = {}
+    for shard in shards:
+        for rel in shard['assigned']:
+            if rel in assigned:
+                problems.append('%s is assigned to shards %d and %d' % (
+                    rel, assigned[rel], shard['shard']))
+            assigned[rel] = shard['shard']
+        for rel, output in shard['converted']:
+            converted.setdefault(rel, []).append((shard['shard'], output))
+    files = {}
+    for rel in sorted(set(assigned) | set(converted)):
+        done = converted.get(rel, [])
+        if not done:
+            problems.append('%s is not converted (shard %d)' % (
+                rel, assigned[rel]))
+        elif len(done) > 1:
+            problems.append('%s is converted %d times (shards %s)' % (
+                rel, len(done), ', '.join(str(index) for index, _ in done)))
+        elif assigned.get(rel) != done[0][0]:
+            problems.append('%s is converted by shard %d, not by its one' %
+                            (rel, done[0][0]))
+        if done:
+            files[rel] = {'shard': done[0][0], 'output': done[0][1]}
+    file_tools.write_file(os.path.join(folder, MERGED_NAME), json.dumps(
+        {'version': SHARD_VERSION, 'count': count, 'files': files,
+         'problems': problems}, indent=1, sort_keys=True))
+    return len(files), problems
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Streaming conversion as a chain of token generators.
+
+Code is converted by three stages, every one is a generator taking the
+output of the previous one:
+
+    tokenize   chunks of source -> (rule, token) pairs, rules are not applied
+    transform  pairs -> tokens converted by the CocosLexer rules
+    format     tokens -> pieces of output text, like CocosLexer.render()
+
+Extra stages are generators of tokens inserted between transform and
+format. Stages run in lock step: rules change lexer state, brackets and
+indentation as they go, so a stage must pass every token on (or drop it,
+or add others) before taking the next one.
+
+The source is fed in chunks and only a window of it is kept, so memory
+stays bounded on very large generated sources.
+"""
+
+import itertools
+import re
+
+# bytes read at once
+CHUNK_SIZE = 1 << 16
+
+# tokens are final only when the window has this many bytes and
+# whitespace separated words after them, rules never look further ahead
+MARGIN = 1 << 10
+WORDS = 16
+
+# the last words of reversed window with whitespace before them
+_TAIL_RE = re.compile(r'\s*(?:\S+\s+){%d}' % WORDS)
+
+def read_chunks(in_file, size=CHUNK_SIZE):
+    """Yields chunks of opened file."""
+    return iter(lambda: in_file.read(size), '')
+
+def split_chunks(code, size=CHUNK_SIZE):
+    """Yields chunks of code."""
+    for start in xrange(0, len(code), size):
+        yield code[start:start + size]
+
+def final_end(data):
+    """Returns position in window up to which its tokens can not change
+    when more source is appended."""
+    end = len(data) - MARGIN
+    if end <= 0:
+        return 0
+    # strings, directives and comments end at a line which is not continued
+    line_end = data.rfind('\n', 0, end + 1)
+    while line_end > 0 and data[line_end - 1] == '\\':
+        line_end = data.rfind('\n', 0, line_end)
+    end = min(end, line_end)
+    # rules may look over whitespace to the following words
+    tail = _TAIL_RE.match(data[::-1])
+    return min(end, len(data) - tail.end()) if tail else 0
+
+class StreamConverter(object):
+    """Converter of code given by chunks, its tokens pass all stages one
+    by one."""
+    def __init__(self, cocos_lexer, stages=(), formatter=None):
+        """Converter creation, the output is formatted by formatter (see
+        format2dx) if it is given.
+
+        Works with a clone of the built lexer, whose rules only record
+        the match, they are applied by transform.
+        """
+        self._cocos_lexer = cocos_lexer.clone()
+        self._cocos_lexer.wrap_rules(self._defer)
+        self.stages = list(stages)
+        self.formatter = formatter
+        # rule of the last matched token
+        self._rule = None
+        self.token_count = 0
+
+    def _defer(self, name, func):
+        """Returns handler keeping the rule instead of applying it."""
+        if name.endswith('_error'):
+            return func
+
+        def deferred(tok):
+            """Passes token to tokenize."""
+            self._rule = func
+            return tok
+        deferred.__name__ = func.__name__
+        return deferred
+
+    @property
+    def objc_calls(self):
+        """Count of Obj-C calls rewritten in the last code."""
+        return self._cocos_lexer.objc_calls
+
+    @property
+    def translated(self):
+        """Count of identifiers translated in the last code."""
+        return self._cocos_lexer.translated
+
+    def refresh(self):
+        """Refreshes state of the lexer."""
+        self._cocos_lexer.refresh()
+
+    def tokenize(self, chunks):
+        """Yields (rule, token) pairs of code given by chunks, token
+        positions are in the whole code."""
+        # pylint: disable=protected-access
+        lexer = self._cocos_lexer._lexer
+        data, offset = '', 0
+        # chunks read after the window, it is lexed again when they are as
+        # long as the window, so a long line or comment is read in linear time
+        waiting, size = [], 0
+        for chunk in itertools.chain(chunks, [None]):
+            if chunk is not None:
+                waiting.append(chunk)
+                size += len(chunk)
+                if size < len(data):
+                    continue
+            data = ''.join([data] + waiting)
+            waiting, size = [], 0
+            end = final_end(data) if chunk is not None else len(data)
+            if end <= 0:
+                continue
+            lexer.input(data)
+            pos = None
+            for tok in lexer:
+                # it may be cut or matched by another rule later, so may
+                # '/' of '/*' whose end the comment rule did not find yet
+                opened = tok.value == '/' and chunk is not None and \
+                    data.startswith('*', lexer.lexpos)
+                if lexer.lexpos > end or opened:
+                    pos = tok.lexpos
+                    break
+                tok.lexpos += offset
+                yield self._rule, tok
+            if pos is None:
+                pos = lexer.lexpos
+            data = data[pos:]
+            offset += pos
+
+    def transform(self, pairs):
+        """Yields tokens converted by the rules."""
+        for rule, tok in pairs:
+            tok = rule(tok)
+            if tok:
+                yield tok
+
+    def format(self, tokens):
+        """Yields pieces of output text of tokens."""
+        cocos_lexer = self._cocos_lexer
+        if cocos_lexer.is_header and not cocos_lexer.pragma_onced:
+            yield '#pragma once\n'
+        if self.formatter is not None:
+            self.formatter.reset()
+            for line in self.formatter.format(tokens):
+                yield line
+            self.token_count = self.formatter.token_count
+            return
+        count = 0
+        for tok in tokens:
+            count += 1
+            if tok.type == 'NEWLINE':
+                yield '%s %s' % (tok.value, '\t' * cocos_lexer.brace_counter)
+            else:
+                yield tok.value + ' '
+        self.token_count = count
+
+    def convert(self, chunks, is_header=False):
+        """Yields pieces of output text of code given by chunks."""
+        self._cocos_lexer.refresh()
+        self._cocos_lexer.is_header = is_header
+        self.token_count = 0
+        tokens = self.transform(self.tokenize(chunks))
+        for stage in self.stages:
+            tokens = stage(tokens)
+        return self.format(tokens)
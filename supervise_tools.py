@@ -0,0 +1,304 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Supervised processing: items have time and memory budgets.
+
+Items are processed by worker processes taking one item at a time, so a
+slow item never holds others back. A worker busy with an item longer
+than the time budget is killed and replaced. The address space of a
+worker is limited to its size after initialization and the memory
+budget, an item exceeding it fails with MemoryError and the worker is
+replaced too. Failed items are quarantined with their reasons, the rest
+of the batch goes on.
+"""
+
+import itertools
+import json
+import multiprocessing
+import os
+import select
+import time
+from timeit import default_timer
+import file_tools
+
+try:
+    import resource
+except ImportError:  # no memory limits on Windows
+    resource = None
+
+# seconds between checks of dead workers while waiting for results
+POLL_TIME = 0.5
+
+# seconds between polls of worker connections on Windows
+WINDOWS_POLL_TIME = 0.01
+
+# seconds to wait for a stopping worker before killing it
+STOP_TIME = 1.0
+
+QUARANTINE_NAME = '.c2dx_quarantine.json'
+
+MEMORY_ERROR = 'memory budget exceeded'
+
+# end of items marker
+_DONE = object()
+
+def get_quarantine_name(file_or_folder):
+    """Returns quarantine report name for the target file or folder."""
+    folder = file_or_folder if os.path.isdir(file_or_folder) \
+        else os.path.dirname(file_or_folder)
+    return os.path.join(folder, QUARANTINE_NAME)
+
+def address_space():
+    """Returns bytes of address space of the process, 0 if unknown."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[0]) * \
+                os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError, ValueError):
+        return 0
+
+def limit_memory(budget):
+    """Limits address space of the process to its size and budget bytes."""
+    if resource is None or not budget:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    limit = address_space() + budget
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+def work(connection, memory, initializer, initargs, function):
+    """Worker process: applies function to items received from connection
+    and sends the results back, items are never None."""
+    if initializer is not None:
+        initializer(*initargs)
+    connection.send((None, None, None))
+    limit_memory(memory)
+    for item in iter(connection.recv, None):
+        try:
+            connection.send((item, function(item), None))
+        except MemoryError:
+            connection.send((item, None, MEMORY_ERROR))
+            return  # the heap may be broken, the worker is replaced
+        except Exception as exc:  # pylint: disable=broad-except
+            connection.send((item, None, '%s: %s' % (
+                type(exc).__name__, exc)))
+
+def _is_readable(worker):
+    """Checks if worker sent something or died (Windows pipes can not be
+    selected)."""
+    try:
+        return worker.connection.poll()
+    except (IOError, OSError):
+        return True  # broken pipe, receiving tells it
+
+def wait(workers, timeout):
+    """Returns workers which sent something or died, waits for them up to
+    timeout seconds."""
+    if os.name != 'nt':
+        return select.select(workers, [], [], timeout)[0]
+    end = default_timer() + timeout
+    while True:
+        ready = [worker for worker in workers if _is_readable(worker)]
+        if ready or default_timer() >= end:
+            return ready
+        time.sleep(WINDOWS_POLL_TIME)
+
+class Worker(object):
+    """Worker process with its own connection and current item.
+
+    The connection is thrown away with the process, so a killed worker
+    never leaves a broken message to the others.
+    """
+    def __init__(self, memory, initializer, initargs, function):
+        """Starts worker process."""
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=work, args=(child, memory, initializer, initargs,
+                               function))
+        self.process.daemon = True
+        self.process.start()
+        # only the worker has its end, so its death ends the connection
+        child.close()
+        self.ready = False
+        self.dead = False
+        self.item = None
+        self.start = None
+
+    def fileno(self):
+        """Returns file descriptor of the connection (for select)."""
+        return self.connection.fileno()
+
+    def send(self, item):
+        """Gives item to the worker."""
+        self.item = item
+        self.start = default_timer()
+        self.connection.send(item)
+
+    def receive(self):
+        """Returns (item, result, error) sent by the worker, None if it
+        died, everything it sent before was received then."""
+        try:
+            return self.connection.recv()
+        except (EOFError, IOError):
+            self.dead = True
+            self.process.join()
+            return None
+
+    def done(self):
+        """Returns seconds of the finished item."""
+        seconds = default_timer() - self.start
+        self.item = self.start = None
+        return seconds
+
+    def kill(self):
+        """Kills worker process."""
+        self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+    def stop(self):
+        """Stops idle worker process."""
+        try:
+            self.connection.send(None)
+        except (IOError, OSError):
+            pass  # already dead
+        self.process.join(STOP_TIME)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.connection.close()
+
+class Supervisor(object):
+    """Pool of supervised worker processes."""
+    def __init__(self, jobs, timeout=None, memory=None, initializer=None,
+                 initargs=()):
+        """Supervisor creation, timeout is seconds and memory is bytes per
+        item (None is no limit), workers are initialized by initializer."""
+        self.jobs = jobs
+        self.timeout = timeout
+        self.memory = memory
+        self.initializer = initializer
+        self.initargs = initargs
+
+    def run(self, function, items):
+        """Yields (item, result, None, seconds) of items processed by
+        function and (item, None, reason, seconds) of quarantined ones."""
+        workers = {}
+
+        def start(index):
+            """Starts or restarts worker."""
+            workers[index] = Worker(self.memory, self.initializer,
+                                    self.initargs, function)
+
+        for index in xrange(self.jobs):
+            start(index)
+        # ready workers without items, the others are busy or starting
+        idle = []
+        items = iter(items)
+        exhausted = False
+        try:
+            while True:
+                while idle and not exhausted:
+                    item = next(items, _DONE)
+                    if item is _DONE:
+                        exhausted = True
+                        break
+                    index = idle.pop()
+                    if workers[index].dead or \
+                            not workers[index].process.is_alive():
+                        # it comes back when it is ready
+                        workers[index].kill()
+                        start(index)
+                        items = itertools.chain([item], items)
+                        continue
+                    workers[index].send(item)
+                busy = [worker for worker in workers.values()
+                        if worker.item is not None]
+                if exhausted and not busy:
+                    break
+                timeout = POLL_TIME
+                if self.timeout is not None:
+                    now = default_timer()
+                    timeout = max(min([timeout] + [
+                        worker.start + self.timeout - now
+                        for worker in busy]), 0)
+                indexes = dict((worker, index)
+                               for index, worker in workers.items()
+                               if not worker.dead)
+                for worker in wait(indexes.keys(), timeout):
+                    message = worker.receive()
+                    if message is None:
+                        continue  # quarantined by the check below
+                    item, result, error = message
+                    index = indexes[worker]
+                    if item is None:
+                        worker.ready = True
+                        idle.append(index)
+                        continue
+                    seconds = worker.done()
+                    if error == MEMORY_ERROR:
+                        worker.stop()
+                        start(index)
+                    else:
+                        idle.append(index)
+                    yield item, result, error, seconds
+                for quarantined in self._check(workers, start):
+                    yield quarantined
+        finally:
+            for worker in workers.values():
+                if worker.item is None:
+                    worker.stop()
+                else:
+                    worker.kill()
+
+    def _check(self, workers, start):
+        """Yields quarantined items of timed out and dead workers, they
+        are restarted."""
+        now = default_timer()
+        for index, worker in workers.items():
+            if worker.item is None:
+                if not worker.ready and worker.dead:
+                    raise RuntimeError('worker failed to start, exit code '
+                                       '%s' % worker.process.exitcode)
+                continue
+            if worker.dead:
+                reason = 'worker died with exit code %s' % (
+                    worker.process.exitcode)
+            elif self.timeout is not None and \
+                    now - worker.start > self.timeout:
+                reason = 'time budget exceeded'
+            else:
+                continue
+            worker.kill()
+            item = worker.item
+            seconds = worker.done()
+            start(index)
+            yield item, None, reason, seconds
+
+class Quarantine(object):
+    """Report of quarantined files, their sources are left as they are."""
+    def __init__(self, file_name):
+        """Empty report creation."""
+        self.file_name = file_name
+        self.files = []
+
+    def add(self, file_name, reason, seconds):
+        """Adds quarantined file."""
+        self.files.append({'file': file_name, 'reason': reason,
+                           'seconds': seconds})
+
+    def report(self):
+        """Returns report lines."""
+        return ['Quarantined %s: %s (%.1f s)' % (
+            record['file'], record['reason'], record['seconds'])
+                for record in self.files]
+
+    def save(self):
+        """Writes report, the previous one is removed if nothing was
+        quarantined."""
+        if self.files:
+            file_tools.write_file(self.file_name, json.dumps(
+                {'files': self.files}, indent=1, sort_keys=True))
+        elif os.path.isfile(self.file_name):
+            os.remove(self.file_name)
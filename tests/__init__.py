@@ -0,0 +1,20 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Tests for Cocos2d to Cocos2d-x converter.
+
+Run them from the project folder, e.g.
+
+    python -m unittest discover -s tests -t .
+"""
+
+import os
+import sys
+
+# modules of the converter are imported as top level ones, like the
+# script and the benchmarks do
+_PROJECT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _PROJECT not in sys.path:
+    sys.path.insert(0, _PROJECT)
+
+__all__ = []
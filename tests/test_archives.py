@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Archives converted member by member (see archive_tools)."""
+
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from benchmarks import corpus
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'convert_script.py')
+
+README = 'Sources of the game.\n'
+
+class ArchiveTest(unittest.TestCase):
+    """Converted archive has the files of a serial run of its tree."""
+    def setUp(self):
+        """Writes the tree and converts it serially."""
+        self.folder = tempfile.mkdtemp(prefix='archives')
+        self.source = os.path.join(self.folder, 'source')
+        corpus.generate(self.source, files=6, size=2048, seed=4)
+        corpus.generate(os.path.join(self.source, 'sub'), files=3,
+                        size=2048, seed=5)
+        with open(os.path.join(self.source, 'README'), 'w') as out:
+            out.write(README)
+        serial = os.path.join(self.folder, 'serial')
+        shutil.copytree(self.source, serial)
+        self.convert(serial)
+        self.expected = {}
+        for root, _, names in os.walk(serial):
+            for name in names:
+                file_name = os.path.join(root, name)
+                with open(file_name, 'rb') as in_file:
+                    self.expected[os.path.relpath(
+                        file_name, serial).replace(os.sep, '/')] = \
+                        in_file.read()
+
+    def tearDown(self):
+        """Removes the files."""
+        shutil.rmtree(self.folder)
+
+    def convert(self, path, *args):
+        """Runs the converter."""
+        subprocess.check_call([sys.executable, SCRIPT, path, '-s'] +
+                              list(args))
+
+    def round_trip(self, in_name, out_name):
+        """Converts archive of the tree, returns its output."""
+        in_name = os.path.join(self.folder, in_name)
+        out_name = os.path.join(self.folder, out_name)
+        self.convert(in_name, '--archive', out_name)
+        return out_name
+
+    def test_tar(self):
+        """Compressed tar archive."""
+        with tarfile.open(os.path.join(self.folder, 'in.tar.gz'),
+                          'w:gz') as tar:
+            tar.add(self.source, '.')
+        out_name = self.round_trip('in.tar.gz', 'out.tar')
+        with tarfile.open(out_name) as tar:
+            # members were added like './README'
+            members = dict((member.name[2:], tar.extractfile(member).read())
+                           for member in tar if member.isfile())
+        self.assertEqual(members, self.expected)
+
+    def test_zip(self):
+        """Zip archive."""
+        with zipfile.ZipFile(os.path.join(self.folder, 'in.zip'),
+                             'w') as archive:
+            for root, _, names in os.walk(self.source):
+                for name in names:
+                    file_name = os.path.join(root, name)
+                    archive.write(file_name, os.path.relpath(
+                        file_name, self.source))
+        out_name = self.round_trip('in.zip', 'out.zip')
+        with zipfile.ZipFile(out_name) as archive:
+            members = dict((name, archive.read(name))
+                           for name in archive.namelist()
+                           if not name.endswith('/'))
+        self.assertEqual(members, self.expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Files affected by changed ones through their imports (see deps_tools)."""
+
+import os
+import shutil
+import tempfile
+import unittest
+import deps_tools
+
+# file : names it imports
+IMPORTS = {
+    'A.h': ['<Foundation/Foundation.h>'],
+    'B.h': ['"A.h"'],
+    'C.m': ['"B.h"', '"C.h"'],
+    'C.h': [],
+    'D.m': ['"C.h"'],
+    'sub/E.m': ['"../A.h"'],
+    'sub/F.h': ['"F.h"', '"G.h"'],
+    'sub/G.h': ['"sub/F.h"'],
+}
+
+class AffectedFilesTest(unittest.TestCase):
+    """Changed files and their importers, imported ones first."""
+    def setUp(self):
+        """Writes the tree."""
+        self.folder = tempfile.mkdtemp(prefix='deps')
+        os.mkdir(os.path.join(self.folder, 'sub'))
+        for name in IMPORTS:
+            self.write(name, IMPORTS[name])
+
+    def tearDown(self):
+        """Removes the files."""
+        shutil.rmtree(self.folder)
+
+    def write(self, name, imports):
+        """Writes file importing names."""
+        with open(os.path.join(self.folder, name), 'w') as out:
+            for imported in imports:
+                out.write('#import %s\n' % imported)
+            out.write('int %s;\n' % os.path.basename(name).replace('.', '_'))
+
+    def affected(self, *changed):
+        """Returns relative names of the affected files."""
+        return [os.path.relpath(fname, self.folder)
+                for fname in deps_tools.affected_files(
+                    self.folder, True, [os.path.join(self.folder, name)
+                                        for name in changed])]
+
+    def test_importers(self):
+        """Files importing the changed one directly or not."""
+        affected = self.affected('A.h')
+        self.assertEqual(sorted(affected), ['A.h', 'B.h', 'C.m', 'sub/E.m'])
+        self.assertLess(affected.index('A.h'), affected.index('B.h'))
+        self.assertLess(affected.index('B.h'), affected.index('C.m'))
+
+    def test_cycle(self):
+        """Files importing each other."""
+        self.assertEqual(sorted(self.affected('sub/G.h')),
+                         ['sub/F.h', 'sub/G.h'])
+
+    def test_changed_imports(self):
+        """Cached graph follows the changed imports."""
+        self.assertEqual(self.affected('C.h'), ['C.h', 'C.m', 'D.m'])
+        self.write('D.m', [])
+        self.assertEqual(self.affected('C.h'), ['C.h', 'C.m'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Conformance of tokenizer engines to PLY and linear time of pathological
+sources (see benchmarks.engines and benchmarks.stress)."""
+
+import os
+import shutil
+import tempfile
+import unittest
+import to2dx
+from benchmarks import corpus, engines, stress
+
+# sources of rules which are easy to break
+SNIPPETS = {
+    'pragma.h': '#pragma once\n@interface Hero : CCSprite\n@end\n',
+    'calls.m': '@implementation Hero\n- (void) run {\n    [[CCDirector '
+               'sharedDirector] replaceScene:[Menu node] withColor:ccc3(0, '
+               '0, 0)];\n}\n@end\n',
+    'strings.m': 'NSLog(@"%@ and %%@ \\"[x y]\\"", self.name);\n',
+    'comments.m': '/* a ** b */ int a; // [x y]\n/* open [x y]\n',
+    'directives.h': '#import <Foundation/Foundation.h>\n#define  SIZE  \\\n'
+                    '    (3)\n#if A /* x */\n#endif\n',
+}
+
+# stress case and its size in bytes, it was quadratic once
+STRESS_CASE = stress.open_comment
+STRESS_SIZE = 1 << 17
+
+class EngineConformanceTest(unittest.TestCase):
+    """Every engine gives the PLY output for both targets."""
+    @classmethod
+    def setUpClass(cls):
+        """Writes the corpus and the snippets."""
+        cls.folder = tempfile.mkdtemp(prefix='corpus')
+        cls.file_list = corpus.generate(cls.folder, files=6, size=8192,
+                                        seed=0)
+        for name, code in sorted(SNIPPETS.items()):
+            cls.file_list.append(cls.write(name, code))
+        for case in stress.CASES:
+            cls.file_list.append(cls.write(case.__name__ + '.m',
+                                           case(4096)))
+
+    @classmethod
+    def tearDownClass(cls):
+        """Removes the files."""
+        shutil.rmtree(cls.folder)
+
+    @classmethod
+    def write(cls, name, code):
+        """Writes file of the folder, returns its name."""
+        file_name = os.path.join(cls.folder, name)
+        with open(file_name, 'w') as out:
+            out.write(code)
+        return file_name
+
+    def check_target(self, v2_flag):
+        """Compares engines on all files."""
+        lexers = engines.make_lexers(v2_flag)
+        for fname in self.file_list:
+            expected = engines.convert(lexers['ply'], fname)[0]
+            for engine in to2dx.ENGINES[1:]:
+                code = engines.convert(lexers[engine], fname)[0]
+                self.assertEqual(code, expected, '%s (%s) %s' % (
+                    fname, engine, engines.first_difference(expected, code)))
+
+    def test_v2(self):
+        """Cocos2d-x-2 target."""
+        self.check_target(True)
+
+    def test_v3(self):
+        """Cocos2d-x-3 target."""
+        self.check_target(False)
+
+class StressTest(unittest.TestCase):
+    """Tokenizing time of a pathological source is linear in its size."""
+    def test_linear_time(self):
+        """Time per byte is in the budget and does not grow."""
+        for engine in to2dx.ENGINES:
+            cocos_lexer = to2dx.CocosLexer()
+            cocos_lexer.build(engine=engine)
+            cocos_lexer.init_version(False)
+            failed, full, quarter, growth = stress.check_case(
+                cocos_lexer, STRESS_CASE, STRESS_SIZE)
+            self.assertFalse(failed, '%s: %.3f us/byte, quarter %.3f, '
+                             'growth %.2fx' % (engine, full, quarter,
+                                               growth))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Spacing and indentation of converted code (see format2dx)."""
+
+import unittest
+import convert_tools
+
+class FormatterTest(unittest.TestCase):
+    """Formatted output of the lexer."""
+    def check(self, code, expected, is_header=True):
+        """Converts and formats code."""
+        self.assertEqual(convert_tools.convert_source(
+            code, is_header, formatted=True), expected)
+
+    def test_directives(self):
+        """Directives start the line with single spaces."""
+        self.check('#define FOO\n#define  BAR 3\n#ifdef FOO\nint a;\n'
+                   '#endif\n',
+                   '#pragma once\n#define FOO\n#define BAR 3\n#ifdef FOO\n'
+                   'int a;\n#endif\n')
+
+    def test_indent(self):
+        """Braces indent the lines."""
+        self.check('void f() {\nif (a) {\nb = -c[1];\n}\n}\n',
+                   'void f() {\n\tif (a) {\n\t\tb = -c[1];\n\t}\n}\n',
+                   False)
+
+if __name__ == '__main__':
+    unittest.main()
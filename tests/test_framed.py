@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Documents converted over one pipe in the framed mode (see
+filter_tools)."""
+
+import os
+import subprocess
+import sys
+import unittest
+from cStringIO import StringIO
+import convert_tools
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'convert_script.py')
+
+HEADER = '#import <Foundation/Foundation.h>\n@interface Hero : CCSprite\n' \
+         '- (void) run;\n@end\n'
+
+SOURCE = '#import "Hero.h"\n@implementation Hero\n- (void) run {\n' \
+         '    [self stopAllActions];\n    NSLog(@"%@ runs", self);\n}\n' \
+         '@end\n'
+
+# the lexer fails on unbalanced braces
+BROKEN = '}\n'
+
+def read_response(out_file):
+    """Returns (code, error message) of the next response."""
+    chunks = []
+    while True:
+        words = out_file.readline().split()
+        if words[0] == 'error':
+            return ''.join(chunks), out_file.read(int(words[1]))
+        size = int(words[0])
+        if not size:
+            return ''.join(chunks), None
+        chunks.append(out_file.read(size))
+
+class FramedTest(unittest.TestCase):
+    """Responses of the documents come in order."""
+    def test_documents(self):
+        """Documents of all kinds, the broken one does not stop others."""
+        documents = [('header', HEADER), ('source', SOURCE),
+                     ('source', BROKEN), ('', HEADER),
+                     ('source', SOURCE * 1000)]
+        process = subprocess.Popen(
+            [sys.executable, SCRIPT, '-', '--framed', '--header'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        # documents are small, the pipe holds the responses
+        for kind, code in documents[:-1]:
+            process.stdin.write(('%d %s' % (len(code), kind)).strip() +
+                                '\n' + code)
+        process.stdin.flush()
+        for kind, code in documents[:-1]:
+            output, error = read_response(process.stdout)
+            if code is BROKEN:
+                self.assertIsNotNone(error)
+                continue
+            self.assertIsNone(error)
+            self.assertEqual(output, convert_tools.convert_source(
+                code, kind != 'source'))
+        # the last one, bigger than the read chunks, ends the input
+        kind, code = documents[-1]
+        rest = StringIO(process.communicate('%d %s\n%s' % (
+            len(code), kind, code))[0])
+        output, error = read_response(rest)
+        self.assertIsNone(error)
+        self.assertEqual(output, convert_tools.convert_source(code, False))
+        self.assertEqual(rest.read(), '')
+        self.assertEqual(process.returncode, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Class names of headers and their cached index (see index_tools)."""
+
+import os
+import shutil
+import tempfile
+import unittest
+import index_tools
+
+HEADER = '#import <Foundation/Foundation.h>\n@class Enemy;\n' \
+         '@interface Hero : NSObject\n@end\n'
+
+class ScanClassesTest(unittest.TestCase):
+    """Declarations are found out of comments only."""
+    def test_comments(self):
+        """Commented out declarations are skipped."""
+        self.assertEqual(index_tools.scan_classes(
+            '// @interface Old : NSObject\n/* @class A, B;\n@protocol C */'
+            ' @interface Hero : NSObject\n@end\n'), ['Hero'])
+
+    def test_strings(self):
+        """Comment marks in strings are not comments."""
+        self.assertEqual(index_tools.scan_classes(
+            'NSString *s = @"/*";\n@class Enemy;\nchar c = \'"\';\n'
+            '@interface Hero\n// */\n'), ['Enemy', 'Hero'])
+
+class ClassIndexTest(unittest.TestCase):
+    """Only changed headers are scanned again."""
+    def setUp(self):
+        """Writes and indexes the header."""
+        self.folder = tempfile.mkdtemp(prefix='index')
+        self.header = os.path.join(self.folder, 'Hero.h')
+        self.write(HEADER)
+        self.assertEqual(self.update(), [self.header])
+
+    def tearDown(self):
+        """Removes the files."""
+        shutil.rmtree(self.folder)
+
+    def write(self, code):
+        """Writes the header with a new modification time."""
+        with open(self.header, 'w') as out:
+            out.write(code)
+        stat = os.stat(self.header)
+        os.utime(self.header, (stat.st_atime, stat.st_mtime + 10))
+
+    def update(self, names=('Enemy', 'Hero')):
+        """Updates the saved index, returns scanned headers."""
+        scanned = []
+        index = index_tools.ClassIndex(index_tools.get_index_name(
+            self.folder))
+        def scan(file_name):
+            """Scans header and remembers it."""
+            scanned.append(file_name)
+            return index_tools.scan_header(file_name)
+        index.scan = scan
+        index.update([self.header])
+        index.save()
+        self.assertEqual(index.class_names(), frozenset(names))
+        return scanned
+
+    def test_unchanged(self):
+        """Header is not scanned again."""
+        self.assertEqual(self.update(), [])
+
+    def test_touched(self):
+        """Header with the same content is not scanned again."""
+        self.write(HEADER)
+        self.assertEqual(self.update(), [])
+        self.assertEqual(self.update(), [])
+
+    def test_changed(self):
+        """Header of the same size is scanned again."""
+        self.write(HEADER.replace('Hero', 'Hera'))
+        self.assertEqual(self.update(('Enemy', 'Hera')), [self.header])
+
+if __name__ == '__main__':
+    unittest.main()
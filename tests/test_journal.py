@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Rollback and backup removal with and without the journal (see
+journal_tools)."""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'convert_script.py')
+
+HEADERS = {
+    'Hero.h': '#import <Foundation/Foundation.h>\n@interface Hero : NSObject'
+              '\n@end\n',
+    'Enemy.h': '#import <Foundation/Foundation.h>\n@interface Enemy : '
+               'NSObject\n@end\n',
+}
+
+class JournalTest(unittest.TestCase):
+    """Hero.h is converted with the journal, Enemy.h without it."""
+    def setUp(self):
+        """Converts the headers."""
+        self.folder = tempfile.mkdtemp(prefix='journal')
+        for name, code in HEADERS.items():
+            with open(os.path.join(self.folder, name), 'w') as out:
+                out.write(code)
+        self.convert('-b', '-J', '--include', 'Hero.h')
+        self.convert('-b', '--include', 'Enemy.h')
+
+    def tearDown(self):
+        """Removes the files."""
+        shutil.rmtree(self.folder)
+
+    def convert(self, *args):
+        """Runs the converter over the folder."""
+        subprocess.check_call([sys.executable, SCRIPT, self.folder] +
+                              list(args))
+
+    def restored(self):
+        """Returns names of headers restored from backups."""
+        names = []
+        for name, code in sorted(HEADERS.items()):
+            with open(os.path.join(self.folder, name)) as in_file:
+                if in_file.read() == code:
+                    names.append(name)
+        return names
+
+    def backups(self):
+        """Returns names of backups."""
+        return sorted(name for name in os.listdir(self.folder)
+                      if name.endswith('.bak'))
+
+    def test_rollback(self):
+        """Without the journal every backup is found."""
+        self.convert('-r')
+        self.assertEqual(self.restored(), ['Enemy.h', 'Hero.h'])
+
+    def test_rollback_journal(self):
+        """The journal replays the backups it has."""
+        self.convert('-r', '-J')
+        self.assertEqual(self.restored(), ['Hero.h'])
+
+    def test_remove_backup(self):
+        """Without the journal every backup is removed."""
+        self.convert('-m')
+        self.assertEqual(self.backups(), [])
+
+    def test_remove_backup_journal(self):
+        """The journal removes the backups it has."""
+        self.convert('-m', '-J')
+        self.assertEqual(self.backups(), ['Enemy.h.bak'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Incremental conversion skips only files which were converted already
+(see manifest_tools)."""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'convert_script.py')
+
+HEADER = '#import <Foundation/Foundation.h>\n@interface Hero : NSObject\n' \
+         '@end\n'
+
+SOURCE = '#import "Hero.h"\n@implementation Hero\n' \
+         '-(void)run{[self  stop];}\n@end\n'
+
+class IncrementalTest(unittest.TestCase):
+    """Files restored by rollback are skipped only if nothing changed."""
+    def setUp(self):
+        """Writes the header."""
+        self.folder = tempfile.mkdtemp(prefix='manifest')
+        self.header = os.path.join(self.folder, 'Hero.h')
+        with open(self.header, 'w') as out:
+            out.write(HEADER)
+
+    def tearDown(self):
+        """Removes the files."""
+        shutil.rmtree(self.folder)
+
+    def convert(self, *args):
+        """Runs the converter over the folder."""
+        subprocess.check_call([sys.executable, SCRIPT, self.folder] +
+                              list(args))
+
+    def read(self):
+        """Returns the header."""
+        with open(self.header) as in_file:
+            return in_file.read()
+
+    def test_rollback(self):
+        """convert, rollback, convert incrementally."""
+        self.convert('-i', '-b')
+        converted = self.read()
+        self.assertNotEqual(converted, HEADER)
+        self.convert('-r')
+        self.assertEqual(self.read(), HEADER)
+        self.convert('-i', '-b')
+        self.assertEqual(self.read(), converted)
+
+    def test_format(self):
+        """Source converted again with formatting is not skipped."""
+        source = os.path.join(self.folder, 'Hero.m')
+        with open(source, 'w') as out:
+            out.write(SOURCE)
+        self.convert('-i', '-b')
+        self.convert('-r')
+        self.convert('-i', '-b', '-f')
+        with open(os.path.join(self.folder, 'Hero.cpp')) as in_file:
+            self.assertIn('void Hero::run() { this->stop(); }',
+                          in_file.read())
+
+    def test_unchanged(self):
+        """convert, convert incrementally, the output is kept."""
+        self.convert('-i')
+        converted = self.read()
+        self.convert('-i')
+        self.assertEqual(self.read(), converted)
+
+if __name__ == '__main__':
+    unittest.main()
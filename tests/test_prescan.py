@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Copying of trivial code by the fast path (see prescan2dx)."""
+
+import unittest
+import convert_tools
+import prescan2dx
+
+class IsTrivialTest(unittest.TestCase):
+    """Trivial code is the code the lexer does not change."""
+    @classmethod
+    def setUpClass(cls):
+        """Builds the lexer."""
+        cls.lexer = convert_tools.get_prototype('v3')
+
+    def check(self, code, trivial):
+        """Checks if header is trivial, the lexer keeps trivial one."""
+        lexer = self.lexer.clone()
+        self.assertEqual(prescan2dx.is_trivial(code, True, lexer.to2dx_func),
+                         trivial)
+        lexer.is_header = True
+        lexer.feed(code)
+        output = ''.join(lexer.render().split())
+        self.assertEqual(output == '#pragmaonce' + ''.join(code.split()),
+                         trivial)
+
+    def test_plain(self):
+        """Plain C code and strings."""
+        self.check('const char *s = "[x y] %d";\nint a[2];\n', True)
+
+    def test_format(self):
+        """String with a format converted by the lexer."""
+        self.check('const char *f = "%@ x";\n', False)
+
+    def test_objc(self):
+        """Obj-C call."""
+        self.check('int x = [a b];\n', False)
+
+class CopyCodeTest(unittest.TestCase):
+    """Headers get '#pragma once' unless they have the directive."""
+    def check(self, code, added):
+        """Copies header, checks if the directive was added."""
+        self.assertEqual(prescan2dx.copy_code(code, True),
+                         '#pragma once\n' + code if added else code)
+
+    def test_directive(self):
+        """Directive is kept."""
+        self.check('int a;\n#pragma  once\n', False)
+
+    def test_comments(self):
+        """Directive in comments is not one."""
+        self.check('// #pragma once\nint a;\n', True)
+        self.check('/* #pragma once */\nint a;\n', True)
+
+    def test_string(self):
+        """Directive in string is not one."""
+        self.check('const char *s = "#pragma once";\n', True)
+
+    def test_source(self):
+        """Sources are copied as they are."""
+        self.assertEqual(prescan2dx.copy_code('int a;\n', False), 'int a;\n')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Conversion split into shards on several nodes and merged again (see
+shard_tools)."""
+
+import filecmp
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import shard_tools
+from benchmarks import corpus
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'convert_script.py')
+
+COUNT = 3
+
+class ShardTest(unittest.TestCase):
+    """Every node converts its shard of the same tree."""
+    def setUp(self):
+        """Converts the tree serially and by the nodes."""
+        self.folder = tempfile.mkdtemp(prefix='shards')
+        source = os.path.join(self.folder, 'source')
+        corpus.generate(source, files=8, size=2048, seed=1)
+        corpus.generate(os.path.join(source, 'sub'), files=4, size=2048,
+                        seed=2)
+        self.serial = self.convert(source, 'serial')
+        self.nodes = [self.convert(source, 'node%d' % index,
+                                   '--shard', '%d/%d' % (index, COUNT))
+                      for index in xrange(1, COUNT + 1)]
+        self.merged = os.path.join(self.folder, 'merged')
+        os.mkdir(self.merged)
+
+    def tearDown(self):
+        """Removes the files."""
+        shutil.rmtree(self.folder)
+
+    def convert(self, source, name, *args):
+        """Converts copy of source, returns its folder."""
+        target = os.path.join(self.folder, name)
+        shutil.copytree(source, target)
+        subprocess.check_call([sys.executable, SCRIPT, target, '-s'] +
+                              list(args))
+        return target
+
+    def collect(self, nodes):
+        """Copies shard manifests of nodes to the merged folder."""
+        for index, node in nodes:
+            name = shard_tools.SHARD_FORMAT % (index, COUNT)
+            shutil.copy(os.path.join(node, name), self.merged)
+
+    def test_merge(self):
+        """Shards together convert every file once like the serial run."""
+        self.collect(enumerate(self.nodes, 1))
+        converted, problems = shard_tools.merge_shards(self.merged)
+        self.assertEqual(problems, [])
+        self.assertEqual(converted, 12)
+        with open(os.path.join(self.merged,
+                               shard_tools.MERGED_NAME)) as in_file:
+            files = json.load(in_file)['files']
+        for record in files.values():
+            output = record['output']
+            self.assertTrue(filecmp.cmp(
+                os.path.join(self.serial, output),
+                os.path.join(self.nodes[record['shard'] - 1], output),
+                False), output)
+
+    def test_missing(self):
+        """Missing shard leaves its files unconverted."""
+        self.collect(list(enumerate(self.nodes, 1))[1:])
+        _, problems = shard_tools.merge_shards(self.merged)
+        self.assertIn('shard 1/%d is missing' % COUNT, problems)
+
+if __name__ == '__main__':
+    unittest.main()
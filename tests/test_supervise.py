@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Supervised processing with killed and dying workers (see
+supervise_tools)."""
+
+import os
+import time
+import unittest
+import supervise_tools
+
+TIMEOUT = 0.3
+
+def process(item):
+    """Returns a long result, dies, hangs or fails for some items."""
+    if item % 7 == 3:
+        os._exit(3)  # pylint: disable=protected-access
+    if item % 7 == 5:
+        time.sleep(10 * TIMEOUT)
+    if item % 7 == 6:
+        raise ValueError(item)
+    return str(item) * 10000
+
+class SupervisorTest(unittest.TestCase):
+    """Results of other items survive workers killed in the middle."""
+    def test_run(self):
+        """Every item gets its result or reason."""
+        supervisor = supervise_tools.Supervisor(3, timeout=TIMEOUT)
+        reasons = {}
+        for item, result, reason, _ in supervisor.run(process, xrange(21)):
+            if reason is None:
+                self.assertEqual(result, str(item) * 10000)
+            reasons[item] = reason
+        self.assertEqual(sorted(reasons), range(21))
+        for item, reason in reasons.items():
+            self.assertEqual(reason, {
+                3: 'worker died with exit code 3',
+                5: 'time budget exceeded',
+                6: 'ValueError: %d' % item}.get(item % 7), item)
+
+if __name__ == '__main__':
+    unittest.main()
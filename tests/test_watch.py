@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Sources written in the watched folder (see watch_tools)."""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import watch_tools
+
+# seconds to wait for a change to be reported
+WAIT_TIME = 5.0
+
+# polls without reports after the expected ones
+QUIET_POLLS = 5
+
+HEADER = '@interface Hero : CCSprite\n@end\n'
+
+class PollWatcherTest(unittest.TestCase):
+    """Written, created and converted files of the watched folder."""
+    def setUp(self):
+        """Writes the tree and starts watching it."""
+        self.folder = tempfile.mkdtemp(prefix='watch')
+        os.mkdir(os.path.join(self.folder, 'sub'))
+        self.header = self.write('Hero.h')
+        self.write('README')
+        self.watcher = self.make_watcher()
+
+    def tearDown(self):
+        """Stops watching and removes the files."""
+        self.watcher.close()
+        shutil.rmtree(self.folder)
+
+    def make_watcher(self):
+        """Returns watcher of the folder."""
+        return watch_tools.PollWatcher(self.folder, True)
+
+    def poll(self):
+        """Returns sources written since the previous poll."""
+        written = self.watcher.poll()
+        if not written:
+            time.sleep(self.watcher.interval)
+        return written
+
+    def wait(self, expected):
+        """Checks that expected files are reported, nothing else."""
+        written = set()
+        end = time.time() + WAIT_TIME
+        while written != set(expected) and time.time() < end:
+            written.update(self.poll())
+        for _ in xrange(QUIET_POLLS):
+            written.update(self.poll())
+        self.assertEqual(sorted(written), sorted(expected))
+
+    def write(self, name, code=HEADER):
+        """Writes file of the folder, returns its name."""
+        file_name = os.path.join(self.folder, name)
+        with open(file_name, 'a') as out:
+            out.write(code)
+        return file_name
+
+    def test_unchanged(self):
+        """Existing files are not reported."""
+        self.wait([])
+
+    def test_written(self):
+        """Written and created sources are reported, other files not."""
+        self.write('Hero.h', '// changed\n')
+        created = self.write(os.path.join('sub', 'Enemy.m'))
+        self.write('notes.txt')
+        self.wait([self.header, created])
+
+    def test_converted(self):
+        """Output written by the converter is not reported."""
+        self.write('Hero.h', '// changed\n')
+        self.wait([self.header])
+        self.write('Hero.h', '#pragma once\n')
+        self.watcher.written(self.header)
+        self.wait([])
+
+class InotifyWatcherTest(PollWatcherTest):
+    """The same with inotify events."""
+    def make_watcher(self):
+        """Returns watcher of the folder, the test is skipped without
+        inotify."""
+        try:
+            return watch_tools.InotifyWatcher(self.folder, True)
+        except OSError as exc:
+            shutil.rmtree(self.folder)
+            raise unittest.SkipTest(str(exc))
+
+    def poll(self):
+        """Returns sources written since the previous poll."""
+        return self.watcher.poll(self.watcher.interval)
+
+if __name__ == '__main__':
+    unittest.main()
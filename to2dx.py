@@ -3,9 +3,55 @@
 
 """Cocos2d to Cocos2d-x-2 parsing tools."""
 
+import hashlib
+import imp
+import mmap
+import os
 import file_tools
 import help2dx
 import ply.lex as lex
+import scan2dx
+
+# default folder for cached lexer tables
+LEXTAB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '.lextab')
+
+# tokenizer engines: PLY is the reference one
+ENGINES = ('ply', 'fast')
+
+# files from this size are mapped to memory instead of being read
+MMAP_THRESHOLD = 1 << 20
+
+def lextab_name():
+    """Returns lexer tables module name bound to this file and PLY version."""
+    digest = hashlib.sha1(lex.__version__ + lex.__tabversion__)
+    with open(os.path.splitext(os.path.abspath(__file__))[0] + '.py',
+              'rb') as src:
+        digest.update(src.read())
+    return 'cocoslextab_' + digest.hexdigest()[:16]
+
+def clone_ply_lexer(lexer, module):
+    """Returns copy of PLY lexer with handlers bound to other module.
+
+    Lexer.clone(module) of PLY 3.x keeps only the last master regular
+    expression of every state, so handlers are rebound here.
+    """
+    def rebind(item):
+        """Returns (handler of the module, token type) of index item."""
+        if not item or not item[0]:
+            return item
+        return getattr(module, item[0].__name__), item[1]
+    clone = lexer.clone()
+    clone.lexstatere = dict(
+        (state, [(regex, [rebind(item) for item in index])
+                 for regex, index in state_re])
+        for state, state_re in lexer.lexstatere.items())
+    clone.lexstateerrorf = dict(
+        (state, getattr(module, func.__name__))
+        for state, func in lexer.lexstateerrorf.items())
+    clone.lexmodule = module
+    clone.begin(lexer.lexstate)
+    return clone
 
 class BracketsStack(list):
     """Brackets stack for CocosLexer."""
@@ -60,7 +106,8 @@ class CocosLexer(object):
     def __init__(self):
         """Lexer creation."""
         self._lexer = None
-        self._stack = BracketsStack()
+        # class names of the project index, None if it is not used
+        self.class_names = None
         self.refresh()  # remaining flags are there
         
     def init_version(self, v2_flag):
@@ -82,6 +129,11 @@ class CocosLexer(object):
         """Setter."""
         self._header = value
 
+    @property
+    def pragma_onced(self):
+        """Checks if '#pragma once' was found."""
+        return self._pragma_onced
+
     @property
     def brace_counter(self):
         """Left braces count."""
@@ -92,6 +144,21 @@ class CocosLexer(object):
         """Setter."""
         pass
 
+    @property
+    def token_count(self):
+        """Count of tokens in the last output."""
+        return self._token_count
+
+    @property
+    def objc_calls(self):
+        """Count of Obj-C calls rewritten since refreshing."""
+        return self._objc_calls
+
+    @property
+    def translated(self):
+        """Count of identifiers translated since refreshing."""
+        return self._translated
+
     ###################
     # Useful methods. #
     ###################
@@ -104,6 +171,13 @@ class CocosLexer(object):
         self._static_method = False
         self._1st_part_parsed = False
 
+    def translate(self, some_id, prefix=False):
+        """Returns correspondence name by to2dx_func, counts changed ones."""
+        name = self.to2dx_func(some_id, prefix)
+        if name != some_id:
+            self._translated += 1
+        return name
+
     def inc_brace(self):
         """Add brace."""
         self._brace_counter += 1
@@ -148,13 +222,89 @@ class CocosLexer(object):
         self._class_name = None
         # count of unclosed left braces
         self._brace_counter = 0
+        # count of tokens in the last output
+        self._token_count = 0
+        # counts of rewritten Obj-C calls and translated identifiers
+        self._objc_calls = 0
+        self._translated = 0
+        # brackets of Obj-C calls and lexer state left by the last input
+        self._stack = BracketsStack()
+        if self._lexer is not None:
+            self._lexer.begin('INITIAL')
+
+    def clone(self):
+        """Returns lexer sharing the built rules with fresh state.
+
+        Handlers of the clone are bound to it, so clones of one lexer can
+        work in parallel threads. Wrapped rules are not copied.
+        """
+        cocos_lexer = CocosLexer()
+        cocos_lexer.to2dx_func = self.to2dx_func
+        cocos_lexer.class_names = self.class_names
+        if isinstance(self._lexer, scan2dx.FastLexer):
+            cocos_lexer._lexer = self._lexer.clone(cocos_lexer)
+        else:
+            cocos_lexer._lexer = clone_ply_lexer(self._lexer, cocos_lexer)
+        cocos_lexer.refresh()
+        return cocos_lexer
 
     ####################
     # Build the Lexer. #
     ####################
-    def build(self, **kwargs):
-        """Lexer Building."""
+    def build(self, cache_dir=None, engine='ply', **kwargs):
+        """Lexer Building.
+
+        With cache_dir the generated tables are stored there and reloaded
+        by the next build instead of introspecting the rules again. The
+        fast engine has no tables to cache.
+        """
+        if engine == 'fast':
+            self._lexer = scan2dx.FastLexer(self, **kwargs)
+            return
+        if cache_dir is None:
+            self._lexer = lex.lex(module=self, **kwargs)
+            return
+        tabname = lextab_name()
+        tabfile = os.path.join(cache_dir, tabname + '.py')
+        if os.path.isfile(tabfile):
+            try:
+                lextab = imp.load_source(tabname, tabfile)
+                self._lexer = lex.lex(module=self, optimize=True,
+                                      lextab=lextab, **kwargs)
+                return
+            except Exception:  # pylint: disable=broad-except
+                pass  # broken or foreign table, rebuild it
         self._lexer = lex.lex(module=self, **kwargs)
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            # concurrent builds must never see a half-written table
+            tmpname = '%s_%d' % (tabname, os.getpid())
+            self._lexer.writetab(tmpname, cache_dir)
+            os.rename(os.path.join(cache_dir, tmpname + '.py'), tabfile)
+        except (IOError, OSError):
+            pass  # read-only location, work without cache
+
+    def wrap_rules(self, wrapper):
+        """Replaces rule handlers of the built lexer by wrapper(name, func)."""
+        if isinstance(self._lexer, scan2dx.FastLexer):
+            self._lexer.wrap_rules(wrapper)
+            return
+        wrapped = set()
+        for state_re in self._lexer.lexstatere.values():
+            # inclusive states share handler lists with INITIAL
+            for _, funcs in state_re:
+                if id(funcs) in wrapped:
+                    continue
+                wrapped.add(id(funcs))
+                for index, item in enumerate(funcs):
+                    if item and item[0]:
+                        funcs[index] = (wrapper(item[0].__name__, item[0]),
+                                        item[1])
+        errorf = self._lexer.lexstateerrorf
+        for state, func in errorf.items():
+            errorf[state] = wrapper(func.__name__, func)
+        self._lexer.lexerrorf = errorf.get(self._lexer.lexstate)
 
     #################
     # Data feeding. #
@@ -163,10 +313,20 @@ class CocosLexer(object):
         """Feeds input data to parsing."""
         self._lexer.input(code)
 
+    def __iter__(self):
+        """Iterates over converted tokens."""
+        return iter(self._lexer)
+
     def feed_from_file(self, file_name):
         """Feeds input data to parsing from file."""
         with open(file_name, 'r') as in_file:
-            self.feed(''.join(in_file.readlines()))
+            size = os.fstat(in_file.fileno()).st_size
+            # mapped bytes are the text only without newline translation
+            if size >= MMAP_THRESHOLD and os.linesep == '\n':
+                self.feed(mmap.mmap(in_file.fileno(), 0,
+                                    access=mmap.ACCESS_READ))
+            else:
+                self.feed(in_file.read())
             self.is_header = file_tools.is_header(file_name)
 
     ################
@@ -180,7 +340,7 @@ class CocosLexer(object):
               # comments
               'SLCOMMENT', 'MLCOMMENT',
               # preprocessor
-              'IMPORT', 'PRAGMA_ONCE', 'DEFINE', 'PREPROCESSOR',
+              'IMPORT', 'PRAGMAONCE', 'DEFINE', 'PREPROCESSOR',
               # @.*
               'CLASSDECL', 'IMPLEMENTATION', 'PROPERTYPLUS',
               'SELECTOR', 'END', 'ATSIGNCLASS',
@@ -204,23 +364,32 @@ class CocosLexer(object):
         r"'([^\\]|\\.)'"
         return tok
 
+    # Patterns below scan in linear time: at every position at most one
+    # alternative of a repetition can match, so a failed match is never
+    # retried split another way. The comment parts start with different
+    # characters and stars are not given back to [^*/]; both string escapes
+    # start with a backslash and are told apart by the next character only
+    # (one takes a newline or a quote, the lookahead of the other refuses
+    # them).
+
     def t_ANY_SLCOMMENT(self, tok):
-        r'//(.|\\\n)*'
+        r'//.*'
         return tok
 
     def t_ANY_MLCOMMENT(self, tok):
-        r'/\*(.|\n)*?\*/'
+        r'/\*[^*]*\*+(?:[^*/][^*]*\*+)*/'
         return tok
 
     def t_ANY_STRING(self, tok):
-        r'@?(?P<str>"(\\\n|\\"|.)*?")'
+        # without an unescaped quote the last escaped one closes the string
+        r'@?(?P<str>"(?:[^"\\\n]|\\[\n"]|\\(?![\n"]))*\\?")'
         tok.value = help2dx.update_format(tok.lexer.lexmatch.group('str'))
         self._last_symbol = '"'
         self._last_word = 'nsstring'
         return tok
 
     def t_ANY_NEWLINE(self, tok):
-        r'(?P<long>\s*\n){2,}|(\s*\n)'
+        r'(?P<long>[^\S\n]*\n\s*\n)|[^\S\n]*\n'
         tok.value = '\n\n' if tok.lexer.lexmatch.group('long') else '\n'
         return tok
 
@@ -243,7 +412,7 @@ class CocosLexer(object):
         return tok
 
     def t_ANY_PREPROCESSOR(self, tok):
-        r'\#((\\\n)|.)*'
+        r'\#(?:[^\\\n]|\\\n?)*'
         return tok
 
     def t_ANY_CLASSDECL(self, tok):
@@ -329,6 +498,8 @@ class CocosLexer(object):
         r'\['
         flag = self.method_call_ability()
         self._stack.push(objccall=flag)
+        if flag:
+            self._objc_calls += 1
         self._last_symbol = '['
         if not flag:
             return tok
@@ -359,7 +530,7 @@ class CocosLexer(object):
 
     def t_methoddecl_PARAMCLASS(self, tok):
         r'\(\s*(?P<name>[a-zA-Z_]\w*)(?P<ast>\s*\*)*?\s*\)'
-        name = self.to2dx_func(tok.lexer.lexmatch.group('name'), self.is_header)
+        name = self.translate(tok.lexer.lexmatch.group('name'), self.is_header)
         ast = tok.lexer.lexmatch.group('ast')
         tok.value = ('static '
                      if self._static_method and self.is_header else '') \
@@ -368,7 +539,7 @@ class CocosLexer(object):
 
     def t_INITIAL_PARAMCLASS(self, tok):  # type casting patch
         r'\(\s*(?P<name>[a-zA-Z_]\w*)(?P<ast>\s*\*)*?\s*\)'
-        name = self.to2dx_func(tok.lexer.lexmatch.group('name'), self.is_header)
+        name = self.translate(tok.lexer.lexmatch.group('name'), self.is_header)
         ast = tok.lexer.lexmatch.group('ast')
         tok.value = '(' + name + ' ' + \
             (str(ast).replace(" ", "") if ast else '') + ')'
@@ -394,7 +565,8 @@ class CocosLexer(object):
             return tok
         initial = tok.value = tok.lexer.lexmatch.group('part')
         if not self._stack.header_parsed():
-            tok.value = help2dx.method2dx(tok.value, self._last_word)
+            tok.value = help2dx.method2dx(tok.value, self._last_word,
+                                          self.class_names)
             self._stack.set_header_parsed()
             self._last_word = initial
         else:
@@ -419,16 +591,17 @@ class CocosLexer(object):
         if self._stack.objc_call():
             # object which is got message
             if not self._stack.object_parsed():
-                tok.value = self.to2dx_func(tok.value, prefix=False)
+                tok.value = self.translate(tok.value, prefix=False)
                 self._stack.set_object_parsed()
             # no args message
             elif not self._stack.header_parsed() and self.message_ability():
-                tok.value = help2dx.method2dx(tok.value, self._last_word)
+                tok.value = help2dx.method2dx(tok.value, self._last_word,
+                                              self.class_names)
                 self._stack.set_header_parsed()
             else:  # just a parameter name or part of object
-                tok.value = self.to2dx_func(tok.value, prefix=False)
+                tok.value = self.translate(tok.value, prefix=False)
         else:
-            tok.value = self.to2dx_func(tok.value, prefix=self.is_header)
+            tok.value = self.translate(tok.value, prefix=self.is_header)
         self._last_symbol = '_'
         self._last_word = initial if initial != 'super' else 'Super'
         return tok
@@ -471,15 +644,35 @@ class CocosLexer(object):
             if tok.type == 'NEWLINE':
                 print '\t' * self.brace_counter,
 
+    def render(self, formatter=None):
+        """Returns new code, unformatted or formatted by formatter (see
+        format2dx)."""
+        chunks = []
+        append = chunks.append
+        if self.is_header and not self._pragma_onced:
+            append('#pragma once\n')
+        if formatter is not None:
+            formatter.reset()
+            chunks.extend(formatter.format(self._lexer))
+            self._token_count = formatter.token_count
+            return ''.join(chunks)
+        count = 0
+        for tok in self._lexer:
+            count += 1
+            append(tok.value)
+            append(' ')
+            if tok.type == 'NEWLINE':
+                append('\t' * self._brace_counter)
+        self._token_count = count
+        return ''.join(chunks)
+
     def file_output(self, file_name):
         """File output."""
+        # the whole input is lexed before the output file is opened, so
+        # writing over the mapped source file is safe
+        code = self.render()
         with open(file_name, 'w') as out:
-            if self.is_header and not self._pragma_onced:
-                out.write('#pragma once\n')
-            for tok in self._lexer:
-                out.write('%s ' % tok.value)
-                if tok.type == 'NEWLINE':
-                    out.write('\t' * self.brace_counter)
+            out.write(code)
 
 # TODO:
 # 1. if/for/while(..) [..] issue
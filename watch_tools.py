@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Watching of sources for continuous conversion.
+
+Files are reported when they were written completely: the polling
+watcher waits until modification time and size stay the same for one
+interval, inotify reports closing of the written file. Outputs written
+by the converter itself (headers are converted in place) are ignored.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+import file_tools
+
+# seconds between polls, a file is reported by the second one after saving
+POLL_INTERVAL = 0.04
+
+WATCH_METHODS = ('auto', 'poll', 'inotify')
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE_SELF = 0x400
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+IN_ONLYDIR = 0x1000000
+IN_EVENT = struct.Struct('iIII')
+
+def stat_key(file_name):
+    """Returns what changes when file is written or replaced."""
+    stat = os.stat(file_name)
+    return stat.st_mtime, stat.st_size, stat.st_ino
+
+class PollWatcher(object):
+    """Finds written sources by comparing modification times.
+
+    Folders are listed again only when their own modification time is
+    changed, that is when entries are created, removed or renamed.
+    """
+    def __init__(self, file_or_folder, with_subfolders, include=(),
+                 exclude=(), interval=POLL_INTERVAL):
+        """Watcher creation, current files are not reported."""
+        self._subfolders = with_subfolders
+        self._include = include
+        self._exclude = exclude
+        self.interval = interval
+        # folder : (modification time, relative path)
+        self._folders = {}
+        # file : stat_key() or None if it is missing
+        self._files = {}
+        # file : stat_key() of a change which is not settled yet
+        self._pending = {}
+        # single file is watched even while it is missing
+        self._single = None
+        if os.path.isdir(file_or_folder):
+            self._scan(file_or_folder, '')
+        else:
+            self._single = file_or_folder
+            self._files[file_or_folder] = self._key(file_or_folder)
+
+    @staticmethod
+    def _key(file_name):
+        """Returns stat_key() of file or None if it is missing."""
+        try:
+            return stat_key(file_name)
+        except OSError:
+            return None
+
+    def _scan(self, folder, rel_folder, new=False):
+        """Lists folder, its new files are reported if new is set."""
+        try:
+            mtime = os.stat(folder).st_mtime
+            files, subfolders = file_tools.scan_folder(
+                folder, rel_folder, self._include, self._exclude,
+                with_subfolders=self._subfolders)
+        except OSError:
+            self._folders.pop(folder, None)
+            return
+        self._folders[folder] = mtime, rel_folder
+        for file_name in files:
+            if file_name not in self._files:
+                self._files[file_name] = None if new \
+                    else self._key(file_name)
+        for subfolder, rel_path in subfolders:
+            if subfolder not in self._folders:
+                self._scan(subfolder, rel_path, new)
+
+    def poll(self):
+        """Returns sources written since the previous poll."""
+        for folder, (mtime, rel_folder) in self._folders.items():
+            try:
+                changed = os.stat(folder).st_mtime != mtime
+            except OSError:
+                del self._folders[folder]
+                continue
+            if changed:
+                self._scan(folder, rel_folder, new=True)
+        written = []
+        for file_name, known in self._files.items():
+            key = self._key(file_name)
+            if key is None and file_name != self._single:
+                del self._files[file_name]
+                self._pending.pop(file_name, None)
+            elif key != known:
+                self._files[file_name] = self._pending[file_name] = key
+            elif file_name in self._pending and key is not None:
+                # unchanged for the whole interval, writing is over
+                del self._pending[file_name]
+                written.append(file_name)
+        return written
+
+    def changes(self):
+        """Yields lists of written sources, forever."""
+        while True:
+            written = self.poll()
+            if written:
+                yield written
+            else:
+                time.sleep(self.interval)
+
+    def written(self, file_name):
+        """Ignores file written by the converter."""
+        if file_name in self._files or file_name == self._single:
+            self._files[file_name] = self._key(file_name)
+            self._pending.pop(file_name, None)
+
+    def close(self):
+        """Stops watching."""
+        pass
+
+class InotifyWatcher(object):
+    """Finds written sources by inotify(7) events of Linux."""
+    def __init__(self, file_or_folder, with_subfolders, include=(),
+                 exclude=(), interval=POLL_INTERVAL):
+        """Watcher creation, raises OSError if inotify is not available."""
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError(errno.ENOSYS, 'C library is not found')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init'):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self._fd = self._libc.inotify_init()
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init failed')
+        self._subfolders = with_subfolders
+        self._include = include
+        self._exclude = exclude
+        self.interval = interval
+        # watch descriptor : (folder, relative path)
+        self._watches = {}
+        # file : stat_key() of the output written by the converter
+        self._outputs = {}
+        self._single = None
+        if os.path.isdir(file_or_folder):
+            self._watch(file_or_folder, '')
+        else:
+            self._single = os.path.basename(file_or_folder)
+            self._watch(os.path.dirname(file_or_folder) or '.', '')
+
+    def _watch(self, folder, rel_folder):
+        """Watches folder and its subfolders, returns their sources."""
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | \
+            IN_ONLYDIR
+        wd = self._libc.inotify_add_watch(self._fd, folder, mask)
+        if wd < 0:
+            return []  # removed meanwhile
+        self._watches[wd] = folder, rel_folder
+        # files may be written before the watch is added
+        try:
+            files, subfolders = file_tools.scan_folder(
+                folder, rel_folder, self._include, self._exclude,
+                with_subfolders=self._subfolders and self._single is None)
+        except OSError:
+            return []
+        for subfolder, rel_path in subfolders:
+            files.extend(self._watch(subfolder, rel_path))
+        return files
+
+    def _accepted(self, name, rel_path):
+        """Checks if file of the event is a watched source."""
+        if self._single is not None:
+            return name == self._single
+        if not file_tools.is_processable_file(name):
+            return False
+        if self._exclude and file_tools.matches(name, rel_path,
+                                                self._exclude):
+            return False
+        return not self._include or \
+            file_tools.matches(name, rel_path, self._include)
+
+    def _is_output(self, file_name):
+        """Checks if file is the unchanged output of the converter."""
+        known = self._outputs.pop(file_name, None)
+        if known is None:
+            return False
+        try:
+            return stat_key(file_name) == known
+        except OSError:
+            return True  # nothing to convert anyway
+
+    def poll(self, timeout=None):
+        """Returns sources written since the previous poll, waits for them
+        up to timeout seconds (the interval by default)."""
+        ready, _, _ = select.select([self._fd], [], [],
+                                    self.interval if timeout is None
+                                    else timeout)
+        if not ready:
+            return []
+        data = os.read(self._fd, 1 << 16)
+        written = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = IN_EVENT.unpack_from(data, offset)
+            offset += IN_EVENT.size
+            name = data[offset:offset + length].rstrip('\0')
+            offset += length
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            if wd not in self._watches or not name:
+                continue
+            folder, rel_folder = self._watches[wd]
+            path = os.path.join(folder, name)
+            rel_path = rel_folder + name
+            if mask & IN_ISDIR:
+                if self._subfolders and self._single is None and \
+                        mask & (IN_CREATE | IN_MOVED_TO) and \
+                        not (self._exclude and file_tools.matches(
+                            name, rel_path, self._exclude)):
+                    written.extend(self._watch(path, rel_path + '/'))
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and \
+                    self._accepted(name, rel_path) and \
+                    not self._is_output(path) and path not in written:
+                written.append(path)
+        return written
+
+    def changes(self):
+        """Yields lists of written sources, forever."""
+        while True:
+            written = self.poll()
+            if written:
+                yield written
+
+    def written(self, file_name):
+        """Ignores file written by the converter."""
+        try:
+            self._outputs[file_name] = stat_key(file_name)
+        except OSError:
+            pass
+
+    def close(self):
+        """Stops watching."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+def make_watcher(method, file_or_folder, with_subfolders, include=(),
+                 exclude=()):
+    """Returns watcher of the method, auto chooses inotify if it works."""
+    if method in ('auto', 'inotify'):
+        try:
+            return InotifyWatcher(file_or_folder, with_subfolders, include,
+                                  exclude)
+        except OSError:
+            if method == 'inotify':
+                raise
+    return PollWatcher(file_or_folder, with_subfolders, include, exclude)